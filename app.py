@@ -2,6 +2,7 @@ from flask import Flask, redirect, url_for
 from flask_login import LoginManager, current_user # Import current_user
 from auth import auth_bp, User # Importar el Blueprint y la clase User
 from views import views_bp # <--- AÑADIR ESTA LÍNEA
+from cliente_index import indice_clientes
 # from db_utils import init_app_db # Si decides usarla
 
 # --- Configuración de la Base de Datos (ya la tienes) ---
@@ -33,6 +34,9 @@ def load_user(user_id):
 app.register_blueprint(auth_bp, url_prefix='/auth') # Rutas de auth estarán bajo /auth
 app.register_blueprint(views_bp) # <--- AÑADIR ESTA LÍNEA
 
+# Índice de clientes para el autocompletado del buscador (se construye y refresca en segundo plano)
+indice_clientes.iniciar()
+
 @app.route('/')
 def home():
     if current_user.is_authenticated:
@@ -1,6 +1,18 @@
-import pandas as pd
-import pyodbc
-from datetime import datetime
+import time
+_INICIO_PROCESO = time.perf_counter() # Referencia para medir el tiempo hasta la primera salida
+
+import os
+import sys
+
+from comun_bot import (COLUMNAS_REQUERIDAS, EXTENSIONES_SOPORTADAS, TIEMPOS_IMPORTACION, importar_diferido,
+                       leer_archivo_reportes, validar_reportes, guardar_rechazados,
+                       insertar_reportes, asegurar_tabla_archivo, asegurar_version_fila,
+                       asegurar_tabla_resumen_envios, acumular_envio_en_resumen)
+from medicion_bot import MedidorEjecucion, guardar_reporte_ejecucion
+
+# pandas, pyodbc y pyarrow NO se importan aquí: cada paso importa solo lo que necesita
+# (ver comun_bot.importar_diferido). Así el bot imprime su primera línea sin pagar la carga de pandas,
+# y el despacho y el informe CSV funcionan sin pandas.
 
 # --- Configuración de la Base de Datos ---
 DB_CONFIG = {
@@ -13,6 +25,20 @@ DB_CONFIG = {
 # --- Nombres de Archivos ---
 EXCEL_FILE = 'reportes_pendientes.xlsx'
 CSV_REPORT_FILE = 'envios_realizados.csv'
+RUN_REPORT_FILE = 'ultima_ejecucion_bot.json'
+
+# --- Arranque ---
+OBJETIVO_PRIMERA_SALIDA_SEG = 0.5 # Objetivo de tiempo hasta la primera línea impresa
+FILAS_POR_LOTE_CSV = 1000
+
+# --- Archivo de reportes enviados ---
+ARCHIVO_DIAS = 90 # Se archivan los reportes enviados que no tuvieron envíos en estos últimos días
+ARCHIVO_LOTE = 500 # Reportes movidos por transacción (lotes chicos = bloqueos cortos)
+ARCHIVO_PAUSA_SEG = 1.0 # Pausa entre lotes para no competir con el despacho
+ARCHIVO_MAX_LOTES_POR_EJECUCION = 20 # Tope del paso de archivo dentro de la ejecución normal del bot
+
+_tiempo_primera_salida = None # Desde que el intérprete empezó a ejecutar bot.py
+_tiempo_primera_salida_proceso = None # Desde que se creó el proceso (incluye intérprete y desempaquetado)
 
 def crear_conexion_db():
     """Crea y retorna una conexión a la base de datos SQL Server."""
@@ -26,6 +52,7 @@ def crear_conexion_db():
     else:
         conn_str += f"UID={DB_CONFIG['username']};PWD={DB_CONFIG['password']};"
     
+    pyodbc = importar_diferido('pyodbc')
     try:
         conn = pyodbc.connect(conn_str)
         print("Conexión a la base de datos establecida exitosamente.")
@@ -36,69 +63,160 @@ def crear_conexion_db():
         print(ex)
         return None
 
-def migrar_excel_a_db(conn):
-    """Lee datos del archivo Excel y los migra a la tabla 'reportes' en la BD."""
+def migrar_excel_a_db(conn, archivo=EXCEL_FILE):
+    """Lee datos del archivo de entrada (Excel, CSV, Parquet o Arrow) y los migra
+    a la tabla 'reportes' en la BD. Retorna la cantidad de filas leídas del archivo."""
     if not conn:
         print("No hay conexión a la base de datos para migrar datos.")
         return
 
+    # El formato se valida antes de tocar la BD: cualquier error posterior pasa por el rollback
+    extension = os.path.splitext(archivo)[1].lower()
+    if extension not in EXTENSIONES_SOPORTADAS:
+        print(f"Error: Formato de archivo no soportado: '{extension}'. Use Excel, CSV, Parquet o Arrow.")
+        return
+
     try:
-        df = pd.read_excel(EXCEL_FILE)
-        print(f"Leyendo datos desde {EXCEL_FILE}...")
+        df = leer_archivo_reportes(archivo)
+        print(f"Leyendo datos desde {archivo}...")
 
-        cursor = conn.cursor()
+        faltantes = [col for col in COLUMNAS_REQUERIDAS if col not in df.columns]
+        if faltantes:
+            print(f"Error: Al archivo {archivo} le faltan las columnas: {', '.join(faltantes)}.")
+            return
 
-        # Validación básica de datos incompletos
-        if df[['id', 'cliente', 'contenido', 'estado']].isnull().any().any():
-            print("Advertencia: Se encontraron filas con datos incompletos en el Excel. Estas filas no se migrarán.")
-            # Opcional: podrías loguear cuáles son o manejarlas de otra forma
-            df.dropna(subset=['id', 'cliente', 'contenido', 'estado'], inplace=True) # Elimina filas con NaN en columnas clave
+        asegurar_tabla_archivo(conn)
+        asegurar_version_fila(conn)
+
+        # Validación vectorizada: a la BD solo llegan filas limpias
+        df, rechazados = validar_reportes(df)
+        if not rechazados.empty:
+            print(f"Advertencia: {len(rechazados)} filas no pasaron la validación y no se migrarán.")
+            # Si el archivo de rechazos no se puede escribir (p. ej. abierto en Excel) se avisa
+            # y se sigue: las filas válidas se migran igual
+            try:
+                print(f"Detalle en {guardar_rechazados(rechazados, archivo)}")
+            except OSError as e:
+                print(f"Advertencia: no se pudo guardar el detalle de filas rechazadas: {e}")
 
         if df.empty:
             print("No hay datos válidos para migrar después de la validación.")
-            return
+            return len(rechazados)
 
-        migrados = 0
-        existentes = 0
-        for index, row in df.iterrows():
-            try:
-                # Verificar si el reporte ya existe para evitar duplicados
-                cursor.execute("SELECT id FROM reportes WHERE id = ?", (row['id'],))
-                if cursor.fetchone():
-                    print(f"Reporte con ID {row['id']} ya existe en la base de datos. Omitiendo.")
-                    existentes += 1
-                    continue
-
-                # Insertar nuevo reporte
-                cursor.execute("""
-                    INSERT INTO reportes (id, cliente, contenido, estado)
-                    VALUES (?, ?, ?, ?)
-                """, (row['id'], row['cliente'], row['contenido'], row['estado']))
-                migrados += 1
-            except pyodbc.Error as ex:
-                print(f"Error al insertar fila ID {row['id']}: {ex}")
-                conn.rollback() # Revertir en caso de error en esta fila específica
-                continue # Continuar con la siguiente fila
-        
-        conn.commit()
-        print(f"Migración completada: {migrados} reportes nuevos insertados, {existentes} reportes ya existían.")
+        migrados, existentes, errores = insertar_reportes(conn, df)
+        print(f"Migración completada: {migrados} reportes nuevos insertados, {existentes} reportes ya existían"
+              + (f", {errores} no se pudieron insertar." if errores else "."))
+        return len(df) + len(rechazados)
 
     except FileNotFoundError:
-        print(f"Error: El archivo {EXCEL_FILE} no fue encontrado.")
+        print(f"Error: El archivo {archivo} no fue encontrado.")
     except Exception as e:
         print(f"Ocurrió un error durante la migración de Excel a BD: {e}")
         if conn:
             conn.rollback() # Revertir toda la transacción si hay un error mayor
 
+# --- Archivo de reportes enviados (tabla "caliente" reportes vs. reportes_archivo) ---
+
+def archivar_reportes_enviados(conn, dias=ARCHIVO_DIAS, lote=ARCHIVO_LOTE, pausa=ARCHIVO_PAUSA_SEG, max_lotes=None):
+    """Mueve a reportes_archivo los reportes 'enviado' sin envíos en los últimos 'dias' días.
+
+    Los 'enviado' sin ningún registro en log_envios (llegaron ya enviados en el archivo de
+    entrada) no tienen fecha de envío de la cual contar la antigüedad: se tratan como
+    envíos viejos y se archivan en la primera pasada. Siguen visibles en el dashboard con
+    "Incluir reportes archivados", y la ingesta no los vuelve a insertar.
+
+    Trabaja de a 'lote' reportes: cada lote es un único DELETE ... OUTPUT INTO (mover y borrar
+    son atómicos) con su propio commit, y entre lotes hace una pausa. La sesión usa
+    DEADLOCK_PRIORITY LOW y LOCK_TIMEOUT, así ante cualquier conflicto con el despacho es el
+    archivo el que cede. Retorna la cantidad de reportes archivados.
+    """
+    if not conn:
+        print("No hay conexión a la base de datos para archivar reportes.")
+        return 0
+
+    pyodbc = importar_diferido('pyodbc')
+    from datetime import date, timedelta
+    limite = date.today() - timedelta(days=dias)
+    archivados = 0
+    lotes = 0
+    try:
+        asegurar_tabla_archivo(conn)
+        cursor = conn.cursor()
+        cursor.execute("SET DEADLOCK_PRIORITY LOW; SET LOCK_TIMEOUT 5000;")
+        while max_lotes is None or lotes < max_lotes:
+            cursor.execute("""
+                DELETE TOP (?) r
+                OUTPUT deleted.id, deleted.cliente, deleted.contenido, deleted.estado
+                INTO reportes_archivo (id, cliente, contenido, estado)
+                FROM reportes r
+                WHERE r.estado = 'enviado'
+                  AND NOT EXISTS (SELECT 1 FROM log_envios l
+                                  WHERE l.reporte_id = r.id AND l.fecha_envio >= ?)
+            """, (lote, limite))
+            movidos = cursor.rowcount
+            conn.commit()
+            archivados += movidos
+            lotes += 1
+            if movidos < lote:
+                break
+            time.sleep(pausa)
+        print(f"Archivo completado: {archivados} reportes sin envíos desde el {limite.isoformat()} "
+              f"movidos a reportes_archivo en {lotes} lotes.")
+    except pyodbc.Error as ex:
+        # Un lote que no pudo tomar sus bloqueos a tiempo se reintenta en la próxima ejecución
+        print(f"Archivo interrumpido tras {archivados} reportes: {ex}")
+        conn.rollback()
+    finally:
+        try:
+            conn.cursor().execute("SET DEADLOCK_PRIORITY NORMAL; SET LOCK_TIMEOUT -1;")
+        except pyodbc.Error:
+            pass
+    return archivados
+
+# --- Resumen diario de envíos (tabla de agregados: fecha x cliente) ---
+
+def compactar_resumen_envios(conn, dias=30):
+    """Recalcula el resumen de los últimos 'dias' días a partir de log_envios.
+
+    Sirve para cargar el histórico la primera vez o para reparar el resumen si se
+    borraron o insertaron logs por fuera del bot. Recorre log_envios solo en ese rango.
+    """
+    if not conn:
+        print("No hay conexión a la base de datos para compactar el resumen de envíos.")
+        return
+
+    from datetime import date, timedelta
+    desde = date.today() - timedelta(days=dias)
+    try:
+        asegurar_tabla_resumen_envios(conn)
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM resumen_envios_diario WHERE fecha >= ?", (desde,))
+        cursor.execute("""
+            INSERT INTO resumen_envios_diario (fecha, cliente, total_envios)
+            SELECT CAST(fecha_envio AS DATE), cliente, COUNT(*)
+            FROM log_envios
+            WHERE fecha_envio >= ?
+            GROUP BY CAST(fecha_envio AS DATE), cliente
+        """, (desde,))
+        filas = cursor.rowcount
+        conn.commit()
+        print(f"Resumen de envíos recalculado desde {desde.isoformat()}: {filas} filas (día x cliente).")
+    except Exception as e:
+        print(f"Ocurrió un error al compactar el resumen de envíos: {e}")
+        conn.rollback()
+
 # --- Funciones principales del bot (se implementarán a continuación) ---
 
 def buscar_y_procesar_reportes_pendientes(conn):
-    """Busca reportes pendientes, los "envía" y actualiza su estado."""
+    """Busca reportes pendientes, los "envía" y actualiza su estado. Retorna cuántos se enviaron."""
     if not conn:
         print("No hay conexión a la base de datos para procesar reportes.")
         return
 
+    pyodbc = importar_diferido('pyodbc')
+    from datetime import datetime
     try:
+        asegurar_tabla_resumen_envios(conn)
         cursor = conn.cursor()
         cursor.execute("SELECT id, cliente, contenido FROM reportes WHERE estado = 'pendiente'")
         reportes_pendientes = cursor.fetchall()
@@ -122,10 +240,14 @@ def buscar_y_procesar_reportes_pendientes(conn):
                 
                 # 3. Registrar en log_envios
                 # Modificación aquí: datetime.now() cambiado a datetime.now().date()
+                fecha_envio = datetime.now().date()
                 cursor.execute("""
                     INSERT INTO log_envios (reporte_id, cliente, fecha_envio)
                     VALUES (?, ?, ?)
-                """, (reporte_id, cliente, datetime.now().date()))
+                """, (reporte_id, cliente, fecha_envio))
+
+                # 4. Actualizar el resumen diario (misma transacción)
+                acumular_envio_en_resumen(cursor, cliente, fecha_envio)
                 
                 conn.commit() # Commit por cada reporte procesado exitosamente
                 print(f"  Reporte ID: {reporte_id} marcado como enviado y logueado.")
@@ -135,6 +257,7 @@ def buscar_y_procesar_reportes_pendientes(conn):
                 conn.rollback() # Revertir cambios para este reporte específico
 
         print(f"\nProceso completado. {procesados_count} reportes fueron procesados y enviados (simulado).")
+        return procesados_count
 
     except Exception as e:
         print(f"Ocurrió un error al procesar reportes pendientes: {e}")
@@ -142,11 +265,17 @@ def buscar_y_procesar_reportes_pendientes(conn):
             conn.rollback()
 
 def generar_informe_csv(conn):
-    """Genera un archivo CSV con los logs de envío del día."""
+    """Genera un archivo CSV con los logs de envío del día.
+
+    Escribe directamente desde el cursor con el módulo csv (por lotes de fetchmany),
+    sin cargar pandas. Retorna la cantidad de filas escritas.
+    """
     if not conn:
         print("No hay conexión a la base de datos para generar el informe.")
         return
 
+    import csv
+    from datetime import datetime
     try:
         # Obtener la fecha de hoy para filtrar los logs
         hoy_inicio = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
@@ -158,14 +287,24 @@ def generar_informe_csv(conn):
             WHERE fecha_envio >= ? AND fecha_envio <= ?
             ORDER BY fecha_envio DESC
         """
-        df_logs = pd.read_sql_query(query, conn, params=(hoy_inicio, hoy_fin))
+        cursor = conn.cursor()
+        cursor.execute(query, (hoy_inicio, hoy_fin))
+        filas = cursor.fetchmany(FILAS_POR_LOTE_CSV)
 
-        if df_logs.empty:
+        if not filas:
             print(f"No se encontraron envíos registrados hoy ({hoy_inicio.strftime('%Y-%m-%d')}) para generar el informe.")
             return
 
-        df_logs.to_csv(CSV_REPORT_FILE, index=False, encoding='utf-8-sig')
+        escritas = 0
+        with open(CSV_REPORT_FILE, 'w', newline='', encoding='utf-8-sig') as archivo_csv:
+            writer = csv.writer(archivo_csv)
+            writer.writerow([columna[0] for columna in cursor.description])
+            while filas:
+                writer.writerows(filas)
+                escritas += len(filas)
+                filas = cursor.fetchmany(FILAS_POR_LOTE_CSV)
         print(f"Informe de envíos del día generado exitosamente: {CSV_REPORT_FILE}")
+        return escritas
 
     except Exception as e:
         print(f"Ocurrió un error al generar el informe CSV: {e}")
@@ -179,35 +318,185 @@ def generar_informe_csv(conn):
 #     print("4. Salir")
 #     return input("Seleccione una opción: ")
 
-def main():
+def _edad_proceso(pid):
+    """Segundos transcurridos desde la creación del proceso 'pid'; None si no se puede medir."""
+    try:
+        if sys.platform == 'win32':
+            import ctypes
+            from ctypes import wintypes
+            kernel32 = ctypes.windll.kernel32
+            kernel32.OpenProcess.restype = wintypes.HANDLE
+            kernel32.GetProcessTimes.argtypes = [wintypes.HANDLE] + [ctypes.POINTER(wintypes.FILETIME)] * 4
+            kernel32.CloseHandle.argtypes = [wintypes.HANDLE]
+            PROCESS_QUERY_LIMITED_INFORMATION = 0x1000
+            handle = kernel32.OpenProcess(PROCESS_QUERY_LIMITED_INFORMATION, False, pid)
+            if not handle:
+                return None
+            try:
+                creacion, salida, kernel, usuario, ahora = (wintypes.FILETIME() for _ in range(5))
+                if not kernel32.GetProcessTimes(handle, ctypes.byref(creacion), ctypes.byref(salida),
+                                                ctypes.byref(kernel), ctypes.byref(usuario)):
+                    return None
+                kernel32.GetSystemTimeAsFileTime(ctypes.byref(ahora))
+            finally:
+                kernel32.CloseHandle(handle)
+            a_entero = lambda ft: (ft.dwHighDateTime << 32) | ft.dwLowDateTime # Unidades de 100 ns
+            return (a_entero(ahora) - a_entero(creacion)) / 1e7
+
+        # Linux: campo 22 de /proc/<pid>/stat (inicio en ticks desde el arranque) vs. /proc/uptime
+        with open(f'/proc/{pid}/stat') as archivo:
+            campos = archivo.read().rsplit(')', 1)[1].split() # El nombre del proceso puede tener espacios
+        with open('/proc/uptime') as archivo:
+            uptime = float(archivo.read().split()[0])
+        return uptime - int(campos[19]) / os.sysconf('SC_CLK_TCK')
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+def _pid_lanzador():
+    """PID del proceso cuya creación marca el inicio real de la ejecución.
+
+    En el build onefile de PyInstaller el bootloader (proceso padre) desempaqueta el
+    ejecutable y recién después lanza el proceso que corre bot.py; se mide desde el padre.
+    """
+    meipass = getattr(sys, '_MEIPASS', None)
+    if getattr(sys, 'frozen', False) and meipass and \
+            os.path.normcase(meipass) != os.path.normcase(os.path.dirname(sys.executable)):
+        return os.getppid()
+    return os.getpid()
+
+def imprimir_perfil_arranque():
+    """Muestra el tiempo hasta la primera salida y lo que tardó cada importación diferida.
+
+    El objetivo se evalúa contra el tiempo desde la creación del proceso (incluye el
+    arranque del intérprete y, en onefile, el desempaquetado). Si la plataforma no permite
+    medirlo, se informa solo el tiempo dentro del intérprete, sin veredicto.
+    Para el detalle completo de importaciones: python -X importtime bot.py
+    """
+    print("\n--- Perfil de arranque ---")
+    objetivo = f"objetivo {OBJETIVO_PRIMERA_SALIDA_SEG * 1000:.0f} ms"
+    if _tiempo_primera_salida_proceso is not None:
+        estado = "OK" if _tiempo_primera_salida_proceso <= OBJETIVO_PRIMERA_SALIDA_SEG else "EXCEDIDO"
+        print(f"Tiempo hasta la primera salida (desde la creación del proceso): "
+              f"{_tiempo_primera_salida_proceso * 1000:.1f} ms ({objetivo}: {estado})")
+    if _tiempo_primera_salida is not None:
+        sufijo = "" if _tiempo_primera_salida_proceso is not None else f" ({objetivo}: no medible sin la creación del proceso)"
+        print(f"Tiempo hasta la primera salida (solo dentro del intérprete): "
+              f"{_tiempo_primera_salida * 1000:.1f} ms{sufijo}")
+    if not TIEMPOS_IMPORTACION:
+        print("No se importaron módulos diferidos.")
+    for nombre, segundos in sorted(TIEMPOS_IMPORTACION.items(), key=lambda item: item[1], reverse=True):
+        print(f"  import {nombre}: {segundos * 1000:.1f} ms")
+    print(f"Tiempo total de ejecución (dentro del intérprete): {(time.perf_counter() - _INICIO_PROCESO) * 1000:.1f} ms")
+
+def parsear_argumentos(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="Bot de Gestión de Reportes (modo automático).")
+    parser.add_argument('archivo', nargs='?', default=EXCEL_FILE,
+                        help="Archivo de entrada (.xlsx, .csv, .parquet, .arrow). Por defecto: %(default)s")
+    parser.add_argument('--profile-imports', action='store_true',
+                        help="Al terminar, muestra el tiempo de arranque y de cada importación diferida.")
+    parser.add_argument('--compactar-resumen', type=int, metavar='DIAS',
+                        help="Solo recalcula resumen_envios_diario de los últimos DIAS días desde log_envios y termina.")
+    parser.add_argument('--archivar', action='store_true',
+                        help="Solo archiva los reportes enviados antiguos (sin tope de lotes) y termina.")
+    parser.add_argument('--dias-archivo', type=int, default=ARCHIVO_DIAS, metavar='DIAS',
+                        help="Días sin envíos tras los cuales se archiva un reporte enviado. Por defecto: %(default)s")
+    parser.add_argument('--tracemalloc', action='store_true',
+                        help="Mide la memoria de cada etapa con tracemalloc (más detalle, pero varias veces más lento).")
+    return parser.parse_args(argv)
+
+def ejecutar_compactacion_resumen(dias):
+    """Tarea periódica: recalcula el resumen de envíos sin ejecutar el resto del bot."""
+    print(f"--- Compactando resumen de envíos (últimos {dias} días) ---")
+    db_conn = crear_conexion_db()
+    if not db_conn:
+        print("No se pudo establecer la conexión con la base de datos. El programa terminará.")
+        return
+    try:
+        compactar_resumen_envios(db_conn, dias)
+    finally:
+        db_conn.close()
+
+def ejecutar_archivo(dias):
+    """Tarea programable: archiva reportes enviados antiguos sin ejecutar el resto del bot."""
+    print(f"--- Archivando reportes enviados hace más de {dias} días ---")
+    db_conn = crear_conexion_db()
+    if not db_conn:
+        print("No se pudo establecer la conexión con la base de datos. El programa terminará.")
+        return
+    try:
+        archivar_reportes_enviados(db_conn, dias=dias)
+    finally:
+        db_conn.close()
+
+def imprimir_reporte_ejecucion(medidor, conn):
+    """Muestra el resumen por etapa y guarda el reporte JSON (archivo + tabla bot_runs)."""
+    reporte = medidor.reporte()
+    print("\n--- Métricas de la ejecución ---")
+    for etapa in reporte['etapas']:
+        print(f"  {etapa['etapa']}: {etapa['segundos']:.2f} s, {etapa['filas']} filas "
+              f"({etapa['filas_por_seg'] or 0} filas/s), {etapa['viajes_bd']} viajes a la BD, "
+              f"memoria pico {etapa['memoria_pico_mb']} MB")
+    error = guardar_reporte_ejecucion(conn, reporte, RUN_REPORT_FILE)
+    if error:
+        print(f"Advertencia: {error}")
+    else:
+        print(f"Reporte de la ejecución guardado en {RUN_REPORT_FILE} y en la tabla bot_runs.")
+
+def main(archivo_entrada=EXCEL_FILE, perfil_importaciones=False, dias_archivo=ARCHIVO_DIAS, memoria_python=False):
     """Función principal del bot que ejecuta todos los pasos automáticamente."""
+    global _tiempo_primera_salida, _tiempo_primera_salida_proceso
     print("--- Iniciando Bot de Gestión de Reportes (Modo Automático) ---")
+    _tiempo_primera_salida = time.perf_counter() - _INICIO_PROCESO
+    if perfil_importaciones:
+        _tiempo_primera_salida_proceso = _edad_proceso(_pid_lanzador())
     db_conn = crear_conexion_db()
 
     if not db_conn:
         print("No se pudo establecer la conexión con la base de datos. El programa terminará.")
         return
 
+    medidor = MedidorEjecucion('cli', memoria_python=memoria_python)
+    conn_medida = medidor.medir(db_conn)
     try:
         # Paso 1: Migrar datos de Excel a Base de Datos
         print("\n--- Paso 1: Migrando datos de Excel a Base de Datos ---")
-        migrar_excel_a_db(db_conn)
+        with medidor.etapa('migrar') as etapa:
+            etapa['filas'] = migrar_excel_a_db(conn_medida, archivo_entrada) or 0
 
         # Paso 2: Procesar y enviar reportes pendientes
         print("\n--- Paso 2: Procesando y enviando reportes pendientes ---")
-        buscar_y_procesar_reportes_pendientes(db_conn)
+        with medidor.etapa('procesar') as etapa:
+            etapa['filas'] = buscar_y_procesar_reportes_pendientes(conn_medida) or 0
 
         # Paso 3: Generar informe de envíos del día (CSV)
         print("\n--- Paso 3: Generando informe de envíos del día (CSV) ---")
-        generar_informe_csv(db_conn)
+        with medidor.etapa('informe') as etapa:
+            etapa['filas'] = generar_informe_csv(conn_medida) or 0
+
+        # Paso 4: Archivar reportes enviados antiguos (último paso y con tope, para no demorar los anteriores)
+        print("\n--- Paso 4: Archivando reportes enviados antiguos ---")
+        with medidor.etapa('archivar') as etapa:
+            etapa['filas'] = archivar_reportes_enviados(conn_medida, dias=dias_archivo,
+                                                        max_lotes=ARCHIVO_MAX_LOTES_POR_EJECUCION)
 
     except Exception as e:
         print(f"Ocurrió un error inesperado durante la ejecución automática: {e}")
     finally:
+        imprimir_reporte_ejecucion(medidor, db_conn)
         if db_conn:
             db_conn.close()
             print("\nConexión a la base de datos cerrada.")
+        if perfil_importaciones:
+            imprimir_perfil_arranque()
         print("--- Bot de Gestión de Reportes ha finalizado su ejecución. ---")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    args = parsear_argumentos()
+    if args.compactar_resumen is not None:
+        ejecutar_compactacion_resumen(args.compactar_resumen)
+    elif args.archivar:
+        ejecutar_archivo(args.dias_archivo)
+    else:
+        main(args.archivo, perfil_importaciones=args.profile_imports, dias_archivo=args.dias_archivo,
+             memoria_python=args.tracemalloc)
\ No newline at end of file
@@ -1,4 +1,32 @@
 # -*- mode: python ; coding: utf-8 -*-
+import os
+
+# Tipo de build:
+#   pyinstaller bot.spec                           -> onefile (un solo bot.exe, se desempaqueta en cada ejecución)
+#   set "BOT_BUILD=onedir" && pyinstaller bot.spec -> onedir (dist/bot/, arranque rápido: no desempaqueta nada)
+# Para ejecuciones programadas se recomienda onedir: el costo de desempaquetado se paga en cada arranque.
+# strip(): en cmd, "set BOT_BUILD=onedir && ..." guarda el valor con el espacio antes de "&&"
+MODO_BUILD = os.environ.get('BOT_BUILD', 'onefile').strip().lower()
+if MODO_BUILD not in ('onefile', 'onedir'):
+    raise SystemExit(f"BOT_BUILD debe ser 'onefile' u 'onedir', no {MODO_BUILD!r}")
+ONEDIR = MODO_BUILD == 'onedir'
+
+# Módulos que el bot nunca usa y que los hooks de pandas/pyarrow arrastran al build.
+# Menos módulos = ejecutable más chico y menos que desempaquetar/importar al arrancar.
+EXCLUDES = [
+    'tkinter',
+    'matplotlib',
+    'IPython',
+    'jupyter',
+    'notebook',
+    'scipy',
+    'sqlalchemy',
+    'pytest',
+    'PyQt5',
+    'PySide2',
+    'pydoc',
+    'unittest',
+]
 
 
 a = Analysis(
@@ -6,33 +34,63 @@ a = Analysis(
     pathex=[],
     binaries=[],
     datas=[],
-    hiddenimports=[],
+    # pandas, pyodbc y pyarrow se importan de forma diferida (importlib) y PyInstaller no los detecta solo
+    hiddenimports=['pandas', 'pyodbc', 'pyarrow', 'openpyxl'],
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
-    excludes=[],
+    excludes=EXCLUDES,
     noarchive=False,
     optimize=0,
 )
 pyz = PYZ(a.pure)
 
-exe = EXE(
-    pyz,
-    a.scripts,
-    a.binaries,
-    a.datas,
-    [],
-    name='bot',
-    debug=False,
-    bootloader_ignore_signals=False,
-    strip=False,
-    upx=True,
-    upx_exclude=[],
-    runtime_tmpdir=None,
-    console=True,
-    disable_windowed_traceback=False,
-    argv_emulation=False,
-    target_arch=None,
-    codesign_identity=None,
-    entitlements_file=None,
-)
+if ONEDIR:
+    exe = EXE(
+        pyz,
+        a.scripts,
+        [],
+        exclude_binaries=True,
+        name='bot',
+        debug=False,
+        bootloader_ignore_signals=False,
+        strip=False,
+        upx=False,
+        console=True,
+        disable_windowed_traceback=False,
+        argv_emulation=False,
+        target_arch=None,
+        codesign_identity=None,
+        entitlements_file=None,
+    )
+    coll = COLLECT(
+        exe,
+        a.binaries,
+        a.datas,
+        strip=False,
+        upx=False,
+        upx_exclude=[],
+        name='bot',
+    )
+else:
+    exe = EXE(
+        pyz,
+        a.scripts,
+        a.binaries,
+        a.datas,
+        [],
+        name='bot',
+        debug=False,
+        bootloader_ignore_signals=False,
+        strip=False,
+        # Sin UPX: descomprimir las DLLs de pandas/numpy en cada arranque cuesta más que lo que ahorra en tamaño
+        upx=False,
+        upx_exclude=[],
+        runtime_tmpdir=None,
+        console=True,
+        disable_windowed_traceback=False,
+        argv_emulation=False,
+        target_arch=None,
+        codesign_identity=None,
+        entitlements_file=None,
+    )
@@ -0,0 +1,162 @@
+import bisect
+import threading
+import time
+
+import db_utils
+
+# Cada cuántos segundos se buscan clientes nuevos
+INTERVALO_REFRESCO_SEG = 30
+LIMITE_SUGERENCIAS = 10
+
+# Toda fila con version_fila menor a este valor ya está confirmada: las transacciones todavía
+# abiertas escriben versiones mayores o iguales. loadtest.py lo reemplaza por el de SQLite.
+SQL_VERSION_MINIMA_ACTIVA = "SELECT MIN_ACTIVE_ROWVERSION()"
+
+
+class ClienteIndex:
+    """Índice en memoria de los clientes distintos (de reportes y reportes_archivo) para el autocompletado.
+
+    Guarda las claves normalizadas (casefold) en una lista ordenada: buscar un prefijo es
+    una búsqueda binaria más un recorrido de a lo sumo 'limite' elementos, sin tocar la BD.
+    Las escrituras arman una lista nueva y la reemplazan de una vez, así las búsquedas
+    nunca ven el índice a medio actualizar y no necesitan lock.
+
+    Se construye una vez al iniciar la app y después solo se agregan los clientes de las
+    filas nuevas (ver refrescar): un cliente cuyos reportes se borran de la BD sigue
+    sugiriéndose hasta que se reinicia la app.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock() # Serializa las actualizaciones (construir/refrescar)
+        # (claves, nombres): claves casefold ordenadas y clave -> nombre del cliente tal como está
+        # en la BD. Se reemplaza la tupla entera de una vez, así una búsqueda siempre ve las dos
+        # partes de la misma versión del índice.
+        self._indice = ([], {})
+        self._version = None # Marca de agua de version_fila para el próximo refresco
+        self._hilo = None
+
+    def __len__(self):
+        return len(self._indice[0])
+
+    def _leer_clientes(self, completo):
+        """Lee clientes de la BD. Retorna (clientes, version), o None si no se pudieron leer.
+
+        Con completo=True lee todos, también los archivados (el dashboard puede buscarlos
+        con "Incluir reportes archivados"). Si no, solo los de las filas de reportes escritas
+        desde la última lectura (version_fila >= self._version). 'version' es la marca de agua
+        para la próxima lectura: None mientras reportes no tenga la columna version_fila.
+        """
+        hay_version = db_utils.hay_version_fila()
+        if not completo and not hay_version:
+            return [], None # Sin la columna el bot todavía no migró nada nuevo
+        conn = db_utils.get_db_connection()
+        if not conn:
+            return None
+        try:
+            cursor = conn.cursor()
+            version = None
+            if hay_version:
+                # Se lee antes que los clientes: lo que se confirme después tiene una versión
+                # mayor o igual y entra en el próximo refresco
+                cursor.execute(SQL_VERSION_MINIMA_ACTIVA)
+                version = cursor.fetchone()[0]
+            if completo:
+                query = "SELECT cliente FROM reportes WHERE cliente IS NOT NULL"
+                if db_utils.hay_tabla_archivo():
+                    query += " UNION SELECT cliente FROM reportes_archivo WHERE cliente IS NOT NULL"
+                params = ()
+            elif self._version is None:
+                # La columna apareció después de construir: se leen una vez las filas que ya tenía
+                query = "SELECT DISTINCT cliente FROM reportes WHERE version_fila < ? AND cliente IS NOT NULL"
+                params = (version,)
+            else:
+                query = ("SELECT DISTINCT cliente FROM reportes "
+                         "WHERE version_fila >= ? AND version_fila < ? AND cliente IS NOT NULL")
+                params = (self._version, version)
+            cursor.execute(query, params)
+            return [fila[0] for fila in cursor.fetchall()], version
+        except Exception as e:
+            print(f"Error al leer los clientes para el índice: {e}")
+            return None
+        finally:
+            conn.close()
+
+    def construir(self):
+        """Carga el índice completo desde la BD. Retorna False si no hubo conexión."""
+        leido = self._leer_clientes(completo=True)
+        if leido is None:
+            return False
+        clientes, version = leido
+        nombres = {}
+        for cliente in clientes:
+            nombres.setdefault(cliente.casefold(), cliente)
+        with self._lock:
+            self._indice = (sorted(nombres), nombres)
+            self._version = version
+        return True
+
+    def refrescar(self):
+        """Agrega los clientes de las filas de reportes escritas desde la última lectura.
+
+        La marca de agua es version_fila (rowversion) y no el id: los ids vienen de los
+        archivos de entrada, así que un reporte nuevo puede tener un id menor a los ya
+        cargados. reportes_archivo no se vuelve a leer: el bot solo mueve ahí filas de
+        reportes, cuyos clientes ya están en el índice.
+        """
+        leido = self._leer_clientes(completo=False)
+        if leido is None:
+            return False
+        clientes, version = leido
+        self.agregar(clientes)
+        if version is not None:
+            with self._lock:
+                self._version = version
+        return True
+
+    def agregar(self, clientes):
+        """Incorpora nombres de cliente al índice (los ya presentes se ignoran)."""
+        with self._lock:
+            claves, nombres = self._indice
+            nuevos = {}
+            for cliente in clientes:
+                clave = cliente.casefold()
+                if clave not in nombres:
+                    nuevos.setdefault(clave, cliente)
+            if not nuevos:
+                return
+            # timsort: une las dos tandas ordenadas en O(n)
+            self._indice = (sorted(claves + list(nuevos)), {**nombres, **nuevos})
+
+    def buscar(self, prefijo, limite=LIMITE_SUGERENCIAS):
+        """Retorna hasta 'limite' clientes que empiezan con 'prefijo' (sin distinguir mayúsculas)."""
+        prefijo = (prefijo or '').strip().casefold()
+        if not prefijo:
+            return []
+        claves, nombres = self._indice # Una sola lectura: las dos partes son de la misma versión
+        resultado = []
+        for posicion in range(bisect.bisect_left(claves, prefijo), len(claves)):
+            clave = claves[posicion]
+            if not clave.startswith(prefijo) or len(resultado) >= limite:
+                break
+            resultado.append(nombres[clave])
+        return resultado
+
+    def iniciar(self, intervalo=INTERVALO_REFRESCO_SEG):
+        """Construye el índice y lo mantiene actualizado desde un hilo en segundo plano."""
+        if self._hilo and self._hilo.is_alive():
+            return
+        self._hilo = threading.Thread(
+            target=self._bucle_refresco, args=(intervalo,), name='cliente-index', daemon=True
+        )
+        self._hilo.start()
+
+    def _bucle_refresco(self, intervalo):
+        while not self.construir():
+            time.sleep(intervalo)
+        while True:
+            time.sleep(intervalo)
+            self.refrescar()
+
+
+# Instancia compartida por la aplicación (se inicia en app.py)
+indice_clientes = ClienteIndex()
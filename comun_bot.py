@@ -0,0 +1,257 @@
+# Código compartido por el bot de consola (bot.py) y el de escritorio (tkBot/bot.py):
+# lectura y validación del archivo de entrada, y las tablas auxiliares que crea el bot.
+# Ambos bots validan con las mismas reglas porque usan estas mismas funciones.
+import importlib
+import os
+import sys
+import time
+
+# pandas, pyodbc y pyarrow no se importan aquí (ver importar_diferido): el bot de consola
+# imprime su primera línea sin pagar la carga de pandas.
+
+# --- Formatos de entrada soportados (el lector se elige por extensión) ---
+COLUMNAS_REQUERIDAS = ['id', 'cliente', 'contenido', 'estado']
+EXTENSIONES_EXCEL = ('.xlsx', '.xls')
+EXTENSIONES_CSV = ('.csv',)
+EXTENSIONES_PARQUET = ('.parquet', '.pq')
+EXTENSIONES_ARROW = ('.arrow', '.feather', '.ipc')
+EXTENSIONES_SOPORTADAS = EXTENSIONES_EXCEL + EXTENSIONES_CSV + EXTENSIONES_PARQUET + EXTENSIONES_ARROW
+
+# --- Reglas de validación de la ingesta ---
+ESTADOS_VALIDOS = ('pendiente', 'enviado', 'error')
+MAX_LARGO_CLIENTE = 255
+MAX_LARGO_CONTENIDO = 4000
+SUFIJO_RECHAZADOS = '_rechazados.csv'
+FILAS_POR_LOTE_INSERCION = 500 # Filas insertadas por commit durante la migración
+
+TIEMPOS_IMPORTACION = {} # modulo -> segundos que tardó en importarse (para --profile-imports del bot)
+
+def importar_diferido(nombre):
+    """Importa un módulo bajo demanda y registra cuánto tardó la importación."""
+    if nombre in sys.modules:
+        return sys.modules[nombre]
+    inicio = time.perf_counter()
+    modulo = importlib.import_module(nombre)
+    TIEMPOS_IMPORTACION[nombre] = time.perf_counter() - inicio
+    return modulo
+
+def leer_archivo_reportes(ruta):
+    """Lee el archivo de entrada en un DataFrame eligiendo el lector según la extensión.
+
+    Excel usa pd.read_excel; CSV y Parquet usan el motor de pyarrow (multihilo);
+    los archivos Arrow IPC/Feather se leen con memory-map, sin copiar el archivo a memoria.
+    """
+    extension = os.path.splitext(ruta)[1].lower()
+    pd = importar_diferido('pandas')
+
+    if extension in EXTENSIONES_EXCEL:
+        return pd.read_excel(ruta)
+
+    if extension in EXTENSIONES_CSV:
+        try:
+            return pd.read_csv(ruta, engine='pyarrow')
+        except ImportError:
+            # Sin pyarrow instalado usamos el parser por defecto de pandas
+            return pd.read_csv(ruta)
+
+    if extension in EXTENSIONES_PARQUET:
+        return pd.read_parquet(ruta, engine='pyarrow')
+
+    if extension in EXTENSIONES_ARROW:
+        pa = importar_diferido('pyarrow')
+        with pa.memory_map(ruta, 'r') as fuente:
+            try:
+                tabla = pa.ipc.open_file(fuente).read_all()
+            except pa.ArrowInvalid:
+                # No es formato "file" (con footer); probamos el formato "stream"
+                fuente.seek(0)
+                tabla = pa.ipc.open_stream(fuente).read_all()
+        return tabla.to_pandas()
+
+    raise ValueError(f"Formato de archivo no soportado: '{extension}'. "
+                     f"Use Excel, CSV, Parquet o Arrow.")
+
+def validar_reportes(df):
+    """Valida todo el DataFrame de una vez (operaciones vectorizadas, sin recorrer filas).
+
+    Retorna (validos, rechazados): 'validos' tiene solo filas listas para insertar
+    (id entero, estado normalizado); 'rechazados' conserva las filas originales con
+    su número de fila en el archivo y una columna 'motivo' con todas las reglas que fallaron.
+    """
+    pd = importar_diferido('pandas')
+    nulos = df[COLUMNAS_REQUERIDAS].isnull().any(axis=1)
+    texto = {col: df[col].astype('string').str.strip() for col in ('cliente', 'contenido', 'estado')}
+    vacios = (texto['cliente'] == '') | (texto['contenido'] == '') | (texto['estado'] == '')
+
+    ids = pd.to_numeric(df['id'], errors='coerce')
+    id_invalido = df['id'].notna() & (ids.isna() | (ids % 1 != 0) | (ids <= 0))
+    estado = texto['estado'].str.lower()
+
+    reglas = [
+        (nulos | vacios.fillna(False), "datos incompletos"),
+        (id_invalido, "id no es un entero positivo"),
+        (ids.notna() & ~id_invalido & ids.duplicated(keep='first'), "id duplicado en el archivo"),
+        (estado.notna() & ~estado.isin(ESTADOS_VALIDOS), "estado desconocido"),
+        (texto['cliente'].str.len().gt(MAX_LARGO_CLIENTE).fillna(False),
+         f"cliente supera {MAX_LARGO_CLIENTE} caracteres"),
+        (texto['contenido'].str.len().gt(MAX_LARGO_CONTENIDO).fillna(False),
+         f"contenido supera {MAX_LARGO_CONTENIDO} caracteres"),
+    ]
+
+    motivos = pd.Series('', index=df.index, dtype=object)
+    for mascara, motivo in reglas:
+        mascara = mascara.astype(bool)
+        motivos = motivos.where(~mascara, motivos + motivo + '; ')
+    rechazo = motivos != ''
+
+    rechazados = df.loc[rechazo].copy()
+    rechazados.insert(0, 'fila', rechazados.index + 2) # +2: encabezado y base 1, como se ve en Excel
+    rechazados['motivo'] = motivos[rechazo].str.rstrip('; ')
+
+    # Se insertan los textos tal como se validaron (sin espacios sobrantes): un cliente de
+    # 250 caracteres más espacios al final pasa la regla de largo y también entra en la columna
+    validos = df.loc[~rechazo, COLUMNAS_REQUERIDAS].copy()
+    validos['id'] = ids[~rechazo].astype('int64')
+    validos['cliente'] = texto['cliente'][~rechazo].astype(object)
+    validos['contenido'] = texto['contenido'][~rechazo].astype(object)
+    validos['estado'] = estado[~rechazo].astype(object)
+    return validos, rechazados
+
+def guardar_rechazados(rechazados, archivo_entrada):
+    """Escribe las filas rechazadas junto al archivo de entrada (<nombre>_rechazados.csv) y retorna la ruta."""
+    ruta = os.path.splitext(archivo_entrada)[0] + SUFIJO_RECHAZADOS
+    rechazados.to_csv(ruta, index=False, encoding='utf-8-sig')
+    return ruta
+
+def insertar_reportes(conn, validos, lote=FILAS_POR_LOTE_INSERCION):
+    """Inserta en 'reportes' las filas validadas que todavía no existen (activas o archivadas).
+
+    Hace commit cada 'lote' filas. Si aun así una fila falla en la BD, se deshace solo esa
+    fila (savepoint tomado en el mismo viaje que el INSERT) y se sigue con las demás: las
+    filas anteriores del lote no se pierden. Retorna (migrados, existentes, errores).
+    """
+    pyodbc = importar_diferido('pyodbc')
+    cursor = conn.cursor()
+    migrados = 0
+    existentes = 0
+    errores = 0
+    sin_commit = 0 # Insertadas en el lote actual, todavía sin commit
+    # astype(object) convierte a tipos nativos de Python (pyodbc no acepta escalares de numpy)
+    filas = validos.astype(object).itertuples(index=False, name=None)
+    for numero, (reporte_id, cliente, contenido, estado) in enumerate(filas, start=1):
+        insertando = False
+        try:
+            cursor.execute("""
+                SELECT id FROM reportes WHERE id = ?
+                UNION ALL
+                SELECT id FROM reportes_archivo WHERE id = ?
+            """, (reporte_id, reporte_id)) # También los archivados, para no volver a insertarlos
+            if cursor.fetchone():
+                existentes += 1
+            else:
+                insertando = True
+                cursor.execute("""
+                    SAVE TRANSACTION fila_reporte;
+                    INSERT INTO reportes (id, cliente, contenido, estado)
+                    VALUES (?, ?, ?, ?)
+                """, (reporte_id, cliente, contenido, estado))
+                sin_commit += 1
+        except pyodbc.Error as ex:
+            print(f"Error al insertar fila ID {reporte_id}: {ex}")
+            errores += 1
+            # Si falló el INSERT se vuelve al savepoint de esta fila. Si falló la lectura o la
+            # transacción quedó inutilizable, se pierde solo lo que faltaba confirmar de este lote
+            deshecha = False
+            if insertando:
+                try:
+                    cursor.execute("ROLLBACK TRANSACTION fila_reporte")
+                    deshecha = True
+                except pyodbc.Error:
+                    pass
+            if not deshecha:
+                conn.rollback()
+                errores += sin_commit
+                sin_commit = 0
+        if numero % lote == 0:
+            conn.commit()
+            migrados += sin_commit
+            sin_commit = 0
+    conn.commit()
+    migrados += sin_commit
+    return migrados, existentes, errores
+
+# --- Archivo de reportes enviados (tabla "caliente" reportes vs. reportes_archivo) ---
+
+SQL_CREAR_REPORTES_ARCHIVO = """
+    IF OBJECT_ID('reportes_archivo', 'U') IS NULL
+    BEGIN
+        -- Mismas columnas y tipos que reportes, más la fecha en que se archivó
+        SELECT TOP 0 id, cliente, contenido, estado INTO reportes_archivo FROM reportes;
+        ALTER TABLE reportes_archivo ADD fecha_archivado DATETIME2 NOT NULL DEFAULT SYSDATETIME();
+        CREATE INDEX IX_reportes_archivo_id ON reportes_archivo (id);
+    END
+    -- Para la regla de archivo: buscar envíos recientes de un reporte es un seek, no un recorrido del log
+    IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_log_envios_reporte_fecha'
+                   AND object_id = OBJECT_ID('log_envios'))
+        CREATE INDEX IX_log_envios_reporte_fecha ON log_envios (reporte_id, fecha_envio);
+"""
+
+def asegurar_tabla_archivo(conn):
+    """Crea la tabla reportes_archivo y el índice de log_envios que usa el archivo, si todavía no existen."""
+    cursor = conn.cursor()
+    cursor.execute(SQL_CREAR_REPORTES_ARCHIVO)
+    conn.commit()
+
+# La web (cliente_index.py) usa version_fila como marca de agua para leer solo los clientes
+# de las filas nuevas. Agregar la columna a una tabla con datos la llena fila por fila:
+# la primera vez tarda según el tamaño de reportes. El índice va por EXEC porque la columna
+# todavía no existe cuando se compila el lote.
+SQL_AGREGAR_VERSION_FILA = """
+    IF COL_LENGTH('reportes', 'version_fila') IS NULL
+        ALTER TABLE reportes ADD version_fila ROWVERSION;
+    IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_reportes_version_fila'
+                   AND object_id = OBJECT_ID('reportes'))
+        EXEC('CREATE INDEX IX_reportes_version_fila ON reportes (version_fila) INCLUDE (cliente)');
+"""
+
+def asegurar_version_fila(conn):
+    """Agrega a reportes la columna version_fila (rowversion) y su índice, si todavía no existen."""
+    cursor = conn.cursor()
+    cursor.execute(SQL_AGREGAR_VERSION_FILA)
+    conn.commit()
+
+# --- Resumen diario de envíos (tabla de agregados: fecha x cliente) ---
+
+SQL_CREAR_RESUMEN_ENVIOS = """
+    IF OBJECT_ID('resumen_envios_diario', 'U') IS NULL
+    CREATE TABLE resumen_envios_diario (
+        fecha DATE NOT NULL,
+        cliente NVARCHAR(255) NOT NULL,
+        total_envios INT NOT NULL,
+        CONSTRAINT PK_resumen_envios_diario PRIMARY KEY (fecha, cliente)
+    )
+"""
+
+def asegurar_tabla_resumen_envios(conn):
+    """Crea la tabla resumen_envios_diario si todavía no existe."""
+    cursor = conn.cursor()
+    cursor.execute(SQL_CREAR_RESUMEN_ENVIOS)
+    conn.commit()
+
+def acumular_envio_en_resumen(cursor, cliente, fecha, cantidad=1):
+    """Suma 'cantidad' envíos al resumen del día para el cliente.
+
+    Se ejecuta en la misma transacción que el INSERT en log_envios, así el resumen
+    nunca queda desfasado respecto del log.
+    """
+    # MERGE con HOLDLOCK: si dos bots (GUI y CLI) envían al mismo cliente el mismo día,
+    # el segundo espera al primero en vez de intentar otro INSERT y violar la PK
+    cursor.execute("""
+        MERGE resumen_envios_diario WITH (HOLDLOCK) AS destino
+        USING (SELECT ? AS fecha, ? AS cliente, ? AS cantidad) AS origen
+            ON destino.fecha = origen.fecha AND destino.cliente = origen.cliente
+        WHEN MATCHED THEN
+            UPDATE SET total_envios = destino.total_envios + origen.cantidad
+        WHEN NOT MATCHED THEN
+            INSERT (fecha, cliente, total_envios) VALUES (origen.fecha, origen.cliente, origen.cantidad);
+    """, (fecha, cliente, cantidad))
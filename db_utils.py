@@ -1,4 +1,6 @@
 import pyodbc
+from collections import namedtuple
+from datetime import timedelta
 
 # No necesitas pasar 'app' si DB_CONFIG es global o accesible de otra manera
 # pero si lo pones en app.config, entonces sí.
@@ -69,26 +71,164 @@ def create_user_db(username, password_hash):
         if conn:
             conn.close()
 
-def get_all_reports(search_term=None):
+COLUMNAS_REPORTES = ['id', 'cliente', 'contenido', 'estado']
+COLUMNAS_LOG_ENVIOS = ['log_id', 'reporte_id', 'cliente', 'fecha_envio']
+FILAS_POR_LOTE = 1000 # Filas por fetchmany al recorrer resultados grandes
+
+# Registro liviano (namedtuple: sin __dict__ por instancia) para filas de 'reportes';
+# en las plantillas se usa igual que el dict: report.id, report.cliente, ...
+Reporte = namedtuple('Reporte', COLUMNAS_REPORTES)
+
+# reportes_archivo y la columna reportes.version_fila las crea el bot la primera vez que migra
+# o archiva; hasta entonces la web no debe nombrarlas en sus consultas. loadtest.py reemplaza
+# estas consultas por las de SQLite.
+SQL_EXISTE_TABLA_ARCHIVO = "SELECT OBJECT_ID('reportes_archivo', 'U')"
+SQL_EXISTE_VERSION_FILA = "SELECT COL_LENGTH('reportes', 'version_fila')"
+# Una vez que existen no se vuelve a consultar (el bot nunca las borra)
+_hay_tabla_archivo = False
+_hay_version_fila = False
+
+def _existe_en_bd(query, descripcion):
+    """Ejecuta una consulta de existencia (OBJECT_ID, COL_LENGTH) y retorna True si dio un valor no nulo."""
     conn = get_db_connection()
     if not conn:
-        return []
-    cursor = conn.cursor()
+        return False
     try:
-        query = "SELECT id, cliente, contenido, estado FROM reportes"
-        params = []
+        cursor = conn.cursor()
+        cursor.execute(query)
+        fila = cursor.fetchone()
+        return bool(fila and fila[0])
+    except pyodbc.Error as e:
+        print(f"Error al buscar {descripcion}: {e}")
+        return False
+    finally:
+        conn.close()
+
+def hay_tabla_archivo():
+    """True si la tabla reportes_archivo ya existe en la BD."""
+    global _hay_tabla_archivo
+    if not _hay_tabla_archivo:
+        _hay_tabla_archivo = _existe_en_bd(SQL_EXISTE_TABLA_ARCHIVO, "la tabla reportes_archivo")
+    return _hay_tabla_archivo
+
+def hay_version_fila():
+    """True si la tabla reportes ya tiene la columna version_fila."""
+    global _hay_version_fila
+    if not _hay_version_fila:
+        _hay_version_fila = _existe_en_bd(SQL_EXISTE_VERSION_FILA, "la columna reportes.version_fila")
+    return _hay_version_fila
+
+def _reports_query(search_term=None, include_archived=False):
+    """Arma la consulta (y sus parámetros) del listado de reportes, con el filtro de búsqueda opcional.
+
+    Por defecto solo lee la tabla activa 'reportes'; con include_archived=True agrega
+    (UNION ALL) los reportes movidos a 'reportes_archivo' por el bot.
+    """
+    tablas = ['reportes', 'reportes_archivo'] if include_archived else ['reportes']
+    partes = []
+    params = []
+    for tabla in tablas:
+        parte = f"SELECT id, cliente, contenido, estado FROM {tabla}"
         if search_term:
-            query += " WHERE cliente LIKE ? OR contenido LIKE ?"
+            parte += " WHERE cliente LIKE ? OR contenido LIKE ?"
             params.extend([f"%{search_term}%", f"%{search_term}%"])
-        query += " ORDER BY id DESC" # O como prefieras ordenarlos
-        
+        partes.append(parte)
+    query = " UNION ALL ".join(partes)
+    query += " ORDER BY id DESC" # O como prefieras ordenarlos
+    return query, params
+
+def _iter_query(query, params, batch_size, row_type=None):
+    """Generador que recorre el resultado de 'query' por lotes de fetchmany.
+
+    Si se indica 'row_type' (un namedtuple), cada fila se entrega convertida a ese tipo.
+    Mantiene abierta su propia conexión mientras se consume y la cierra al terminar
+    (o si el consumidor abandona el generador), así la memoria usada no depende
+    del tamaño del resultado.
+    Los errores (sin conexión, o de la BD a mitad del recorrido) se propagan: cortar el
+    recorrido en silencio dejaría una descarga truncada que parece completa.
+    """
+    conn = get_db_connection()
+    if not conn:
+        raise RuntimeError("No se pudo conectar a la base de datos")
+    try:
+        cursor = conn.cursor()
         cursor.execute(query, params)
-        reports = cursor.fetchall() # Lista de tuplas
-        # Convertir a lista de diccionarios para facilitar el uso en plantillas
-        columns = [column[0] for column in cursor.description]
-        return [dict(zip(columns, report)) for report in reports]
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            for row in rows:
+                yield row_type._make(row) if row_type else row
+    except pyodbc.Error as e:
+        print(f"Error al recorrer resultados: {e}")
+        raise
+    finally:
+        conn.close()
+
+def iter_reports(search_term=None, include_archived=False, batch_size=FILAS_POR_LOTE):
+    """Reportes (como Reporte) filtrados por cliente, entregados de a uno sin armar la lista."""
+    # Sin tabla de archivo todavía no hay reportes archivados que agregar
+    include_archived = include_archived and hay_tabla_archivo()
+    query, params = _reports_query(search_term, include_archived)
+    return _iter_query(query, params, batch_size, row_type=Reporte)
+
+def iter_send_log(desde, hasta, batch_size=FILAS_POR_LOTE):
+    """Filas de log_envios con fecha_envio entre 'desde' y 'hasta' (fechas, inclusive)."""
+    query = """
+        SELECT log_id, reporte_id, cliente, fecha_envio
+        FROM log_envios
+        WHERE fecha_envio >= ? AND fecha_envio < ?
+        ORDER BY fecha_envio DESC
+    """
+    return _iter_query(query, [desde, hasta + timedelta(days=1)], batch_size)
+
+GRANULARIDADES_STATS = ('dia', 'semana', 'mes')
+
+# Expresión SQL (SQL Server) con la fecha de inicio del período de cada fila del resumen.
+# La semana empieza el lunes sin importar SET DATEFIRST.
+EXPRESIONES_PERIODO = {
+    'dia': "fecha",
+    'semana': "DATEADD(day, -((DATEPART(weekday, fecha) + @@DATEFIRST - 2) % 7), fecha)",
+    'mes': "DATEFROMPARTS(YEAR(fecha), MONTH(fecha), 1)",
+}
+
+def get_send_stats(desde, hasta, granularidad='dia', cliente=None, por_cliente=False):
+    """Envíos por período entre 'desde' y 'hasta' (fechas, inclusive).
+
+    Lee la tabla de agregados resumen_envios_diario (una fila por día x cliente que
+    mantiene el bot), nunca log_envios, y suma por período en la BD: el resultado tiene
+    una fila por período (o por período x cliente si por_cliente=True).
+    Retorna una lista de dicts {'periodo', 'total'} (+ 'cliente') ordenada por período.
+    """
+    conn = get_db_connection()
+    if not conn:
+        return []
+    cursor = conn.cursor()
+    try:
+        periodo = EXPRESIONES_PERIODO[granularidad]
+        agrupacion = f"{periodo}, cliente" if por_cliente else periodo
+        query = f"""
+            SELECT {agrupacion}, SUM(total_envios) FROM resumen_envios_diario
+            WHERE fecha >= ? AND fecha <= ?
+        """
+        params = [desde, hasta]
+        if cliente:
+            query += " AND cliente = ?"
+            params.append(cliente)
+        query += f" GROUP BY {agrupacion} ORDER BY {agrupacion}"
+        cursor.execute(query, params)
+
+        resultado = []
+        for fila in cursor.fetchall():
+            inicio = fila[0]
+            registro = {'periodo': inicio.isoformat() if hasattr(inicio, 'isoformat') else str(inicio),
+                        'total': int(fila[-1])}
+            if por_cliente:
+                registro['cliente'] = fila[1]
+            resultado.append(registro)
+        return resultado
     except pyodbc.Error as e:
-        print(f"Error al obtener reportes: {e}")
+        print(f"Error al obtener estadísticas de envíos: {e}")
         return []
     finally:
         if conn:
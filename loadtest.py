@@ -0,0 +1,350 @@
+"""Prueba de carga de la app web contra una base SQLite local que reemplaza a SQL Server.
+
+Simula N usuarios que inician sesión por /auth/login, dejan el dashboard abierto
+(consultando /_get_reports_table con la cadencia del JavaScript del dashboard) y de
+vez en cuando escriben una búsqueda, mientras un hilo hace de bot: ingesta reportes
+nuevos y los despacha. Al final muestra, por endpoint, throughput, latencias
+p50/p95/p99 y tasa de errores.
+
+Uso:
+    python loadtest.py --usuarios 50 --duracion 120
+    python loadtest.py --usuarios 200 --duracion 60 --intervalo-poll 2   # carga más agresiva
+"""
+import argparse
+import logging
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import types
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import defaultdict
+from datetime import date, timedelta
+from http.cookiejar import CookieJar
+
+PASSWORD_PRUEBA = 'carga123'
+CLIENTES_PRUEBA = ['Atento', 'Banco Sur', 'Banco Norte', 'Bancolombia', 'Claro', 'Movistar',
+                   'Telefónica', 'Entel', 'Falabella', 'Ripley', 'Cencosud', 'Sodimac']
+TIMEOUT_REQUEST_SEG = 30
+
+SQL_ESQUEMA = """
+    CREATE TABLE usuarios (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        username TEXT UNIQUE NOT NULL,
+        password_hash TEXT NOT NULL
+    );
+    CREATE TABLE reportes (
+        id INTEGER PRIMARY KEY,
+        cliente TEXT NOT NULL,
+        contenido TEXT NOT NULL,
+        estado TEXT NOT NULL,
+        version_fila INTEGER
+    );
+    -- Hace de rowversion: cada inserción toma una versión mayor a todas las anteriores
+    CREATE INDEX IX_reportes_version_fila ON reportes (version_fila);
+    CREATE TRIGGER TR_reportes_version_fila AFTER INSERT ON reportes
+    BEGIN
+        UPDATE reportes SET version_fila = (SELECT COALESCE(MAX(version_fila), 0) + 1 FROM reportes)
+        WHERE rowid = NEW.rowid;
+    END;
+    CREATE TABLE reportes_archivo (
+        id INTEGER NOT NULL,
+        cliente TEXT NOT NULL,
+        contenido TEXT NOT NULL,
+        estado TEXT NOT NULL,
+        fecha_archivado TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    CREATE TABLE log_envios (
+        log_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        reporte_id INTEGER NOT NULL,
+        cliente TEXT NOT NULL,
+        fecha_envio DATE NOT NULL
+    );
+    CREATE INDEX IX_log_envios_reporte_fecha ON log_envios (reporte_id, fecha_envio);
+    CREATE TABLE resumen_envios_diario (
+        fecha DATE NOT NULL,
+        cliente TEXT NOT NULL,
+        total_envios INTEGER NOT NULL,
+        PRIMARY KEY (fecha, cliente)
+    );
+"""
+
+SQL_EXISTE_TABLA_ARCHIVO_SQLITE = "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'reportes_archivo'"
+SQL_EXISTE_VERSION_FILA_SQLITE = "SELECT 1 FROM pragma_table_info('reportes') WHERE name = 'version_fila'"
+# En SQLite las escrituras se serializan y una transacción abierta no es visible: su versión
+# siempre queda por encima del máximo confirmado
+SQL_VERSION_MINIMA_ACTIVA_SQLITE = "SELECT COALESCE(MAX(version_fila), 0) + 1 FROM reportes"
+
+# Equivalentes SQLite de db_utils.EXPRESIONES_PERIODO (que usa funciones de SQL Server)
+EXPRESIONES_PERIODO_SQLITE = {
+    'dia': "fecha",
+    'semana': "date(fecha, '-' || ((CAST(strftime('%w', fecha) AS INTEGER) + 6) % 7) || ' days')",
+    'mes': "date(fecha, 'start of month')",
+}
+
+
+# --- Base de datos de prueba ---
+
+def reemplazar_pyodbc():
+    """Registra un módulo 'pyodbc' respaldado por sqlite3, antes de importar db_utils y la app.
+
+    La prueba no usa ODBC (todas las conexiones salen de conectar_sqlite), así que no hace
+    falta tener pyodbc ni unixODBC instalados. Además los 'except pyodbc.Error' de la app
+    atrapan los errores de SQLite, como en producción atrapan los de SQL Server.
+    """
+    def connect(*args, **kwargs):
+        raise sqlite3.OperationalError("loadtest.py no usa ODBC: las conexiones son a SQLite")
+
+    modulo = types.ModuleType('pyodbc')
+    modulo.Error = sqlite3.Error
+    modulo.connect = connect
+    sys.modules['pyodbc'] = modulo
+
+def conectar_sqlite(ruta):
+    # PARSE_DECLTYPES: las columnas DATE vuelven como datetime.date, igual que con pyodbc
+    conn = sqlite3.connect(ruta, timeout=30, check_same_thread=False,
+                           detect_types=sqlite3.PARSE_DECLTYPES)
+    conn.execute("PRAGMA journal_mode=WAL")
+    return conn
+
+def crear_base_prueba(ruta, cantidad_reportes, cantidad_usuarios):
+    """Crea el esquema y carga reportes, usuarios y algunos días de envíos."""
+    from passlib.hash import pbkdf2_sha256
+
+    conn = conectar_sqlite(ruta)
+    conn.executescript(SQL_ESQUEMA)
+    rnd = random.Random(0)
+
+    reportes = [
+        (i, rnd.choice(CLIENTES_PRUEBA), f"Reporte de prueba número {i}. " * 5,
+         rnd.choice(('pendiente', 'enviado', 'enviado', 'error')))
+        for i in range(1, cantidad_reportes + 1)
+    ]
+    conn.executemany("INSERT INTO reportes (id, cliente, contenido, estado) VALUES (?, ?, ?, ?)", reportes)
+
+    # Todos los usuarios comparten contraseña: se hashea una sola vez
+    password_hash = pbkdf2_sha256.hash(PASSWORD_PRUEBA)
+    conn.executemany("INSERT INTO usuarios (username, password_hash) VALUES (?, ?)",
+                     [(f"usuario{i}", password_hash) for i in range(cantidad_usuarios)])
+
+    hoy = date.today()
+    conn.executemany(
+        "INSERT INTO resumen_envios_diario VALUES (?, ?, ?)",
+        [(hoy - timedelta(days=dias), cliente, rnd.randint(1, 50))
+         for dias in range(90) for cliente in CLIENTES_PRUEBA]
+    )
+    conn.commit()
+    conn.close()
+
+
+# --- Registro de resultados ---
+
+class Resultados:
+    """Latencias y errores por endpoint, compartido entre todos los hilos."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencias = defaultdict(list)
+        self.errores = defaultdict(int)
+        self.detalle_errores = defaultdict(int)
+
+    def registrar(self, endpoint, segundos, error=None):
+        with self._lock:
+            self.latencias[endpoint].append(segundos)
+            if error:
+                self.errores[endpoint] += 1
+                self.detalle_errores[f"{endpoint}: {error}"] += 1
+
+def percentil(valores_ordenados, p):
+    """Percentil por rango más cercano (valores ya ordenados)."""
+    if not valores_ordenados:
+        return 0.0
+    indice = max(0, min(len(valores_ordenados) - 1, int(round(p / 100 * len(valores_ordenados))) - 1))
+    return valores_ordenados[indice]
+
+def imprimir_resultados(resultados, duracion):
+    print(f"\n{'endpoint':<26}{'requests':>9}{'req/s':>9}{'errores':>9}{'err %':>8}"
+          f"{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    for endpoint in sorted(resultados.latencias):
+        latencias = sorted(resultados.latencias[endpoint])
+        total, errores = len(latencias), resultados.errores[endpoint]
+        print(f"{endpoint:<26}{total:>9}{total / duracion:>9.1f}{errores:>9}{errores / total * 100:>7.1f}%"
+              f"{percentil(latencias, 50) * 1000:>9.1f}{percentil(latencias, 95) * 1000:>9.1f}"
+              f"{percentil(latencias, 99) * 1000:>9.1f}")
+    if resultados.detalle_errores:
+        print("\nErrores:")
+        for detalle, cantidad in sorted(resultados.detalle_errores.items(), key=lambda item: -item[1]):
+            print(f"  {cantidad:>6} x {detalle}")
+
+
+# --- Usuario simulado ---
+
+class _SinRedirecciones(urllib.request.HTTPRedirectHandler):
+    """Deja los 302 sin seguir: un redirect al login indica que la sesión no es válida."""
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+class UsuarioSimulado(threading.Thread):
+    def __init__(self, numero, base_url, resultados, fin, intervalo_poll, intervalo_busqueda):
+        super().__init__(name=f"usuario{numero}", daemon=True)
+        self.username = f"usuario{numero}"
+        self.base_url = base_url
+        self.resultados = resultados
+        self.fin = fin
+        self.intervalo_poll = intervalo_poll
+        self.intervalo_busqueda = intervalo_busqueda
+        self.rnd = random.Random(numero)
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(CookieJar()), _SinRedirecciones()
+        )
+
+    def _pedir(self, endpoint, ruta, datos=None, estado_esperado=200):
+        """Hace el request, lee la respuesta completa y registra la latencia. Retorna el status."""
+        cuerpo = urllib.parse.urlencode(datos).encode() if datos else None
+        inicio = time.perf_counter()
+        error, estado = None, None
+        try:
+            with self.opener.open(self.base_url + ruta, data=cuerpo, timeout=TIMEOUT_REQUEST_SEG) as respuesta:
+                respuesta.read()
+                estado = respuesta.status
+        except urllib.error.HTTPError as e:
+            estado = e.code
+            e.read()
+        except Exception as e:
+            error = type(e).__name__
+        if error is None and estado != estado_esperado:
+            error = f"HTTP {estado}"
+        self.resultados.registrar(endpoint, time.perf_counter() - inicio, error)
+        return estado
+
+    def _abrir_dashboard(self, busqueda=''):
+        ruta = '/dashboard' + (f"?search={urllib.parse.quote(busqueda)}" if busqueda else '')
+        self._pedir('/dashboard', ruta)
+        self._pedir('/stats', '/stats')
+
+    def _escribir_busqueda(self):
+        # Como al tipear en el buscador: una sugerencia por tecla y después el submit
+        cliente = self.rnd.choice(CLIENTES_PRUEBA)
+        largo = self.rnd.randint(2, min(6, len(cliente)))
+        for fin_prefijo in range(1, largo + 1):
+            self._pedir('/_autocomplete_clientes',
+                        f"/_autocomplete_clientes?q={urllib.parse.quote(cliente[:fin_prefijo])}")
+        self.busqueda = cliente[:largo]
+        self._abrir_dashboard(self.busqueda)
+
+    def run(self):
+        time.sleep(self.rnd.uniform(0, self.intervalo_poll)) # Los usuarios no llegan todos juntos
+        estado = self._pedir('/auth/login', '/auth/login',
+                             {'username': self.username, 'password': PASSWORD_PRUEBA}, estado_esperado=302)
+        if estado != 302:
+            return
+        self.busqueda = ''
+        self._abrir_dashboard()
+
+        proxima_busqueda = time.monotonic() + self.rnd.expovariate(1 / self.intervalo_busqueda)
+        while not self.fin.wait(self.intervalo_poll):
+            if time.monotonic() >= proxima_busqueda:
+                self._escribir_busqueda()
+                proxima_busqueda = time.monotonic() + self.rnd.expovariate(1 / self.intervalo_busqueda)
+            ruta = '/_get_reports_table' + (f"?search={urllib.parse.quote(self.busqueda)}" if self.busqueda else '')
+            self._pedir('/_get_reports_table', ruta)
+
+
+# --- Bot simulado ---
+
+def bot_simulado(ruta_bd, fin, resultados, intervalo, lote, primer_id):
+    """Ingesta 'lote' reportes pendientes y despacha los pendientes cada 'intervalo' segundos,
+    con los equivalentes SQLite de las sentencias de bot.py (un commit por reporte despachado)."""
+    conn = conectar_sqlite(ruta_bd)
+    rnd = random.Random(1)
+    proximo_id = primer_id
+    while not fin.wait(intervalo):
+        inicio = time.perf_counter()
+        nuevos = [(proximo_id + i, rnd.choice(CLIENTES_PRUEBA), "Reporte ingestado durante la prueba.", 'pendiente')
+                  for i in range(lote)]
+        proximo_id += lote
+        conn.executemany("INSERT INTO reportes (id, cliente, contenido, estado) VALUES (?, ?, ?, ?)", nuevos)
+        conn.commit()
+        resultados.registrar('bot: ingesta', time.perf_counter() - inicio)
+
+        inicio = time.perf_counter()
+        pendientes = conn.execute("SELECT id, cliente FROM reportes WHERE estado = 'pendiente'").fetchall()
+        for reporte_id, cliente in pendientes:
+            hoy = date.today()
+            conn.execute("UPDATE reportes SET estado = 'enviado' WHERE id = ?", (reporte_id,))
+            conn.execute("INSERT INTO log_envios (reporte_id, cliente, fecha_envio) VALUES (?, ?, ?)",
+                         (reporte_id, cliente, hoy))
+            # Como el MERGE WITH (HOLDLOCK) de comun_bot.acumular_envio_en_resumen: una sola sentencia
+            # atómica, sin la carrera entre UPDATE e INSERT cuando otro escritor suma al mismo día y cliente
+            conn.execute("""
+                INSERT INTO resumen_envios_diario (fecha, cliente, total_envios) VALUES (?, ?, 1)
+                ON CONFLICT (fecha, cliente) DO UPDATE SET total_envios = total_envios + excluded.total_envios
+            """, (hoy, cliente))
+            conn.commit()
+        resultados.registrar('bot: despacho', time.perf_counter() - inicio)
+    conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--usuarios', type=int, default=20, help="Usuarios simultáneos (default: %(default)s)")
+    parser.add_argument('--duracion', type=float, default=60, help="Segundos de carga (default: %(default)s)")
+    parser.add_argument('--intervalo-poll', type=float, default=10,
+                        help="Segundos entre actualizaciones de la tabla, como en dashboard.html (default: %(default)s)")
+    parser.add_argument('--intervalo-busqueda', type=float, default=30,
+                        help="Segundos promedio entre búsquedas de cada usuario (default: %(default)s)")
+    parser.add_argument('--reportes', type=int, default=5000, help="Reportes iniciales (default: %(default)s)")
+    parser.add_argument('--bot-intervalo', type=float, default=5, help="Segundos entre corridas del bot (default: %(default)s)")
+    parser.add_argument('--bot-lote', type=int, default=50, help="Reportes ingestados por corrida (default: %(default)s)")
+    args = parser.parse_args()
+
+    directorio = tempfile.mkdtemp(prefix='loadtest_')
+    ruta_bd = os.path.join(directorio, 'reportes.db')
+    print(f"Creando base de prueba en {ruta_bd} ({args.reportes} reportes, {args.usuarios} usuarios)...")
+    crear_base_prueba(ruta_bd, args.reportes, args.usuarios)
+
+    # Toda la app obtiene sus conexiones por db_utils.get_db_connection: se reemplaza antes de importarla
+    reemplazar_pyodbc()
+    import db_utils
+    db_utils.get_db_connection = lambda: conectar_sqlite(ruta_bd)
+    db_utils.EXPRESIONES_PERIODO = EXPRESIONES_PERIODO_SQLITE
+    db_utils.SQL_EXISTE_TABLA_ARCHIVO = SQL_EXISTE_TABLA_ARCHIVO_SQLITE
+    db_utils.SQL_EXISTE_VERSION_FILA = SQL_EXISTE_VERSION_FILA_SQLITE
+    import cliente_index
+    cliente_index.SQL_VERSION_MINIMA_ACTIVA = SQL_VERSION_MINIMA_ACTIVA_SQLITE
+    from werkzeug.serving import make_server
+    from app import app
+
+    logging.getLogger('werkzeug').setLevel(logging.WARNING) # Sin una línea de log por request
+    servidor = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=servidor.serve_forever, name='servidor', daemon=True).start()
+    base_url = f"http://127.0.0.1:{servidor.server_port}"
+    print(f"App escuchando en {base_url}. Carga durante {args.duracion:.0f} s...")
+
+    resultados = Resultados()
+    fin = threading.Event()
+    hilos = [threading.Thread(target=bot_simulado, name='bot', daemon=True,
+                              args=(ruta_bd, fin, resultados, args.bot_intervalo, args.bot_lote, args.reportes + 1))]
+    hilos += [UsuarioSimulado(numero, base_url, resultados, fin, args.intervalo_poll, args.intervalo_busqueda)
+              for numero in range(args.usuarios)]
+
+    inicio = time.perf_counter()
+    for hilo in hilos:
+        hilo.start()
+    time.sleep(args.duracion)
+    fin.set()
+    for hilo in hilos:
+        hilo.join(TIMEOUT_REQUEST_SEG)
+    duracion = time.perf_counter() - inicio
+
+    servidor.shutdown()
+    imprimir_resultados(resultados, duracion)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,241 @@
+# Medición de la ejecución del bot (tiempo, filas/seg, viajes a la BD y memoria por etapa).
+# La comparten el bot de consola (bot.py) y el de escritorio (tkBot/bot.py).
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+INTERVALO_MUESTREO_MEMORIA_SEG = 0.1 # Cada cuánto se lee la memoria residente durante una etapa
+
+SQL_CREAR_BOT_RUNS = """
+    IF OBJECT_ID('bot_runs', 'U') IS NULL
+    CREATE TABLE bot_runs (
+        run_id INT IDENTITY(1,1) PRIMARY KEY,
+        origen NVARCHAR(20) NOT NULL,
+        inicio DATETIME2 NOT NULL,
+        duracion_seg FLOAT NOT NULL,
+        filas INT NOT NULL,
+        viajes_bd INT NOT NULL,
+        memoria_pico_mb FLOAT NULL,
+        reporte_json NVARCHAR(MAX) NOT NULL
+    )
+"""
+
+def _memoria_proceso_mb():
+    """(actual, pico) de la memoria residente del proceso en MB; cualquiera de los dos es None
+    si no se puede medir. El pico es el del proceso entero y no se puede reiniciar."""
+    if sys.platform == 'win32':
+        import ctypes
+        from ctypes import wintypes
+
+        class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+            _fields_ = [('cb', wintypes.DWORD), ('PageFaultCount', wintypes.DWORD),
+                        ('PeakWorkingSetSize', ctypes.c_size_t), ('WorkingSetSize', ctypes.c_size_t),
+                        ('QuotaPeakPagedPoolUsage', ctypes.c_size_t), ('QuotaPagedPoolUsage', ctypes.c_size_t),
+                        ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t), ('QuotaNonPagedPoolUsage', ctypes.c_size_t),
+                        ('PagefileUsage', ctypes.c_size_t), ('PeakPagefileUsage', ctypes.c_size_t)]
+
+        contadores = PROCESS_MEMORY_COUNTERS()
+        contadores.cb = ctypes.sizeof(contadores)
+        kernel32, psapi = ctypes.windll.kernel32, ctypes.windll.psapi
+        kernel32.GetCurrentProcess.restype = wintypes.HANDLE
+        psapi.GetProcessMemoryInfo.argtypes = [wintypes.HANDLE, ctypes.c_void_p, wintypes.DWORD]
+        if psapi.GetProcessMemoryInfo(kernel32.GetCurrentProcess(), ctypes.byref(contadores), contadores.cb):
+            return contadores.WorkingSetSize / (1024 * 1024), contadores.PeakWorkingSetSize / (1024 * 1024)
+        return None, None
+
+    actual = None
+    try:
+        with open('/proc/self/statm') as statm: # Linux: la 2.ª columna es la memoria residente, en páginas
+            actual = int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        pass
+    pico = None
+    try:
+        import resource
+        pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        pico /= 1024 * 1024 if sys.platform == 'darwin' else 1024 # macOS informa bytes, Linux KB
+    except ImportError:
+        pass
+    return actual, pico
+
+class _MuestreoMemoria:
+    """Pico de memoria residente durante una etapa, sin instrumentar las asignaciones.
+
+    Un hilo lee la memoria actual cada INTERVALO_MUESTREO_MEMORIA_SEG y guarda la mayor.
+    Si en la etapa el proceso marcó un pico nuevo, se usa ese valor, que es exacto
+    (un pico más corto que el intervalo puede no llegar a verse en las muestras).
+    """
+    def __init__(self, intervalo=INTERVALO_MUESTREO_MEMORIA_SEG):
+        self._mayor = None
+        self._pico_inicio = _memoria_proceso_mb()[1]
+        self._fin = threading.Event()
+        self._hilo = threading.Thread(target=self._muestrear, args=(intervalo,),
+                                      name='muestreo-memoria', daemon=True)
+        self._hilo.start()
+
+    def _muestrear(self, intervalo):
+        while True:
+            self._registrar(_memoria_proceso_mb()[0])
+            if self._fin.wait(intervalo):
+                return
+
+    def _registrar(self, megas):
+        if megas is not None and (self._mayor is None or megas > self._mayor):
+            self._mayor = megas
+
+    def detener(self):
+        """Termina el muestreo y retorna el pico de la etapa en MB (None si no se pudo medir)."""
+        self._fin.set()
+        self._hilo.join()
+        actual, pico = _memoria_proceso_mb()
+        self._registrar(actual)
+        if pico is not None and self._pico_inicio is not None and pico > self._pico_inicio:
+            return round(pico, 1)
+        return round(self._mayor, 1) if self._mayor is not None else None
+
+class _CursorMedido:
+    """Cursor que cuenta cada execute y cada fetch como un viaje a la BD; el resto se delega al cursor real."""
+    def __init__(self, cursor, medidor):
+        self._cursor = cursor
+        self._medidor = medidor
+
+    def execute(self, *args):
+        self._medidor.viajes_bd += 1
+        self._cursor.execute(*args)
+        return self
+
+    def executemany(self, *args):
+        self._medidor.viajes_bd += 1
+        self._cursor.executemany(*args)
+        return self
+
+    def fetchone(self):
+        self._medidor.viajes_bd += 1
+        return self._cursor.fetchone()
+
+    def fetchmany(self, *args):
+        self._medidor.viajes_bd += 1
+        return self._cursor.fetchmany(*args)
+
+    def fetchall(self):
+        self._medidor.viajes_bd += 1
+        return self._cursor.fetchall()
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __getattr__(self, nombre):
+        return getattr(self._cursor, nombre)
+
+class ConexionMedida:
+    """Envuelve la conexión pyodbc para contar viajes a la BD (execute, fetch, commit, rollback)."""
+    def __init__(self, conn, medidor):
+        self._conn = conn
+        self._medidor = medidor
+
+    def cursor(self):
+        return _CursorMedido(self._conn.cursor(), self._medidor)
+
+    def commit(self):
+        self._medidor.viajes_bd += 1
+        self._conn.commit()
+
+    def rollback(self):
+        self._medidor.viajes_bd += 1
+        self._conn.rollback()
+
+    def __getattr__(self, nombre):
+        return getattr(self._conn, nombre)
+
+class MedidorEjecucion:
+    """Registra, para cada etapa del bot, tiempo, filas/seg, viajes a la BD y pico de memoria.
+
+    Por defecto el pico es el de la memoria residente del proceso durante la etapa
+    (ver _MuestreoMemoria), que no agrega costo a la etapa. Con memoria_python=True se
+    mide con tracemalloc lo que asignó cada etapa (objetos de Python y buffers de
+    numpy/pandas): es más detallado pero hace la ejecución varias veces más lenta, así que
+    solo sirve para investigar un problema de memoria, no para seguir tendencias.
+    """
+    def __init__(self, origen, memoria_python=False):
+        from datetime import datetime
+        self.origen = origen
+        self.inicio = datetime.now()
+        self.viajes_bd = 0
+        self.etapas = []
+        self.memoria_python = memoria_python
+        self._t0 = time.perf_counter()
+        self._inicio_tracemalloc = memoria_python and not tracemalloc.is_tracing()
+        if self._inicio_tracemalloc:
+            tracemalloc.start()
+
+    def medir(self, conn):
+        """Retorna la conexión envuelta para que sus viajes a la BD se cuenten en este medidor."""
+        return ConexionMedida(conn, self)
+
+    @contextmanager
+    def etapa(self, nombre):
+        """Mide el bloque como una etapa; dentro se puede asignar registro['filas']."""
+        registro = {'etapa': nombre, 'filas': 0}
+        if self.memoria_python:
+            tracemalloc.reset_peak()
+        else:
+            muestreo = _MuestreoMemoria()
+        inicio, viajes_inicio = time.perf_counter(), self.viajes_bd
+        try:
+            yield registro
+        finally:
+            segundos = time.perf_counter() - inicio
+            registro['segundos'] = round(segundos, 3)
+            registro['filas_por_seg'] = round(registro['filas'] / segundos, 1) if segundos > 0 else None
+            registro['viajes_bd'] = self.viajes_bd - viajes_inicio
+            if self.memoria_python:
+                registro['memoria_pico_mb'] = round(tracemalloc.get_traced_memory()[1] / (1024 * 1024), 1)
+            else:
+                registro['memoria_pico_mb'] = muestreo.detener()
+            self.etapas.append(registro)
+
+    def reporte(self):
+        if self._inicio_tracemalloc and tracemalloc.is_tracing():
+            tracemalloc.stop()
+        picos = [etapa['memoria_pico_mb'] for etapa in self.etapas if etapa['memoria_pico_mb'] is not None]
+        return {
+            'origen': self.origen,
+            'inicio': self.inicio.isoformat(timespec='seconds'),
+            'duracion_seg': round(time.perf_counter() - self._t0, 3),
+            'filas': sum(etapa['filas'] for etapa in self.etapas),
+            'viajes_bd': self.viajes_bd,
+            'memoria_pico_mb': max(picos, default=None),
+            # Las dos medidas no son comparables entre sí: las tendencias se siguen con 'rss'
+            'medida_memoria': 'tracemalloc' if self.memoria_python else 'rss',
+            'etapas': self.etapas,
+        }
+
+def guardar_reporte_ejecucion(conn, reporte, ruta_json):
+    """Escribe el reporte de la ejecución en 'ruta_json' y lo agrega al historial bot_runs.
+    Retorna un mensaje de error, o None si todo salió bien."""
+    import json
+    from datetime import datetime
+    try:
+        with open(ruta_json, 'w', encoding='utf-8') as archivo:
+            json.dump(reporte, archivo, ensure_ascii=False, indent=2)
+    except OSError as e:
+        return f"No se pudo escribir {ruta_json}: {e}"
+
+    if not conn:
+        return "Sin conexión a BD: la ejecución no se registró en bot_runs."
+    try:
+        cursor = conn.cursor()
+        cursor.execute(SQL_CREAR_BOT_RUNS)
+        cursor.execute("""
+            INSERT INTO bot_runs (origen, inicio, duracion_seg, filas, viajes_bd, memoria_pico_mb, reporte_json)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, (reporte['origen'], datetime.fromisoformat(reporte['inicio']), reporte['duracion_seg'], reporte['filas'],
+              reporte['viajes_bd'], reporte['memoria_pico_mb'], json.dumps(reporte, ensure_ascii=False)))
+        conn.commit()
+        return None
+    except Exception as e:
+        conn.rollback()
+        return f"No se pudo registrar la ejecución en bot_runs: {e}"
@@ -2,10 +2,19 @@ import pandas as pd
 import pyodbc
 from datetime import datetime
 import os
+import sys
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk # ttk para el Treeview
 import tkinter.font as tkFont # <--- AÑADIR ESTA LÍNEA
 
+# Lectura, validación, tablas auxiliares y medición se comparten con el bot de consola
+# (comun_bot.py y medicion_bot.py, en la carpeta superior)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from comun_bot import (COLUMNAS_REQUERIDAS, EXTENSIONES_SOPORTADAS, leer_archivo_reportes, validar_reportes,
+                       guardar_rechazados, insertar_reportes, asegurar_tabla_archivo, asegurar_version_fila,
+                       asegurar_tabla_resumen_envios, acumular_envio_en_resumen)
+from medicion_bot import MedidorEjecucion, guardar_reporte_ejecucion
+
 # --- Configuración de la Base de Datos ---
 DB_CONFIG = {
     'driver': '{ODBC Driver 17 for SQL Server}',
@@ -18,6 +27,10 @@ DB_CONFIG = {
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 # EXCEL_FILE ya no será una constante global fija, se seleccionará desde la GUI
 CSV_REPORT_FILE = os.path.join(SCRIPT_DIR, 'envios_realizados.csv')
+RUN_REPORT_FILE = os.path.join(SCRIPT_DIR, 'ultima_ejecucion_bot.json')
+
+# python bot.py --tracemalloc: mide la memoria de cada etapa con tracemalloc (varias veces más lento)
+MEDIR_MEMORIA_PYTHON = '--tracemalloc' in sys.argv
 
 def crear_conexion_db():
     """Crea y retorna una conexión a la base de datos SQL Server."""
@@ -43,54 +56,57 @@ def crear_conexion_db():
         return None
 
 def migrar_excel_a_db(conn, excel_file_path):
-    """Lee datos del archivo Excel y los migra a la tabla 'reportes' en la BD.
-    Retorna (migrados, existentes, error_msg)
+    """Lee datos del archivo de entrada (Excel, CSV, Parquet o Arrow) y los migra
+    a la tabla 'reportes' en la BD.
+    Retorna (migrados, existentes, rechazados, ruta_rechazados, error_msg); las filas
+    rechazadas quedan en <nombre>_rechazados.csv junto al archivo de entrada
+    (ruta_rechazados es None si no hubo rechazos o no se pudo escribir ese archivo).
     """
     if not conn:
-        return 0, 0, "No hay conexión a la base de datos para migrar datos."
+        return 0, 0, 0, None, "No hay conexión a la base de datos para migrar datos."
+
+    # El formato se valida antes de tocar la BD: cualquier error posterior pasa por el rollback
+    extension = os.path.splitext(excel_file_path)[1].lower()
+    if extension not in EXTENSIONES_SOPORTADAS:
+        return 0, 0, 0, None, f"Formato de archivo no soportado: '{extension}'. Use Excel, CSV, Parquet o Arrow."
 
-    migrados = 0
-    existentes = 0
+    ruta_rechazados = None
     try:
-        df = pd.read_excel(excel_file_path)
+        df = leer_archivo_reportes(excel_file_path)
         # print(f"Leyendo datos desde {excel_file_path}...") # Silenciado para GUI
 
-        cursor = conn.cursor()
-
-        if df[['id', 'cliente', 'contenido', 'estado']].isnull().any().any():
-            # print("Advertencia: Se encontraron filas con datos incompletos en el Excel...") # Silenciado
-            df.dropna(subset=['id', 'cliente', 'contenido', 'estado'], inplace=True)
+        faltantes = [col for col in COLUMNAS_REQUERIDAS if col not in df.columns]
+        if faltantes:
+            return 0, 0, 0, None, f"Al archivo le faltan las columnas: {', '.join(faltantes)}."
 
-        if df.empty:
-            return 0, 0, "No hay datos válidos para migrar después de la validación."
+        asegurar_tabla_archivo(conn)
+        asegurar_version_fila(conn)
 
-        for index, row in df.iterrows():
+        # Validación vectorizada: a la BD solo llegan filas limpias
+        df, rechazados = validar_reportes(df)
+        if not rechazados.empty:
+            # Si el archivo de rechazos no se puede escribir (p. ej. abierto en Excel) se avisa
+            # y se sigue: las filas válidas se migran igual
             try:
-                cursor.execute("SELECT id FROM reportes WHERE id = ?", (row['id'],))
-                if cursor.fetchone():
-                    # print(f"Reporte con ID {row['id']} ya existe...") # Silenciado
-                    existentes += 1
-                    continue
+                ruta_rechazados = guardar_rechazados(rechazados, excel_file_path)
+            except OSError as e:
+                print(f"Advertencia: no se pudo guardar el detalle de filas rechazadas: {e}")
 
-                cursor.execute("""
-                    INSERT INTO reportes (id, cliente, contenido, estado)
-                    VALUES (?, ?, ?, ?)
-                """, (row['id'], row['cliente'], row['contenido'], row['estado']))
-                migrados += 1
-            except pyodbc.Error as ex:
-                # print(f"Error al insertar fila ID {row['id']}: {ex}") # Silenciado
-                conn.rollback()
-                continue
-        
-        conn.commit()
-        return migrados, existentes, None
+        if df.empty:
+            return 0, 0, len(rechazados), ruta_rechazados, "No hay datos válidos para migrar después de la validación."
+
+        migrados, existentes, errores = insertar_reportes(conn, df)
+        if errores:
+            return (migrados, existentes, len(rechazados), ruta_rechazados,
+                    f"{errores} filas válidas no se pudieron insertar en la BD (detalle en la consola).")
+        return migrados, existentes, len(rechazados), ruta_rechazados, None
 
     except FileNotFoundError:
-        return 0, 0, f"Error: El archivo {excel_file_path} no fue encontrado."
+        return 0, 0, 0, None, f"Error: El archivo {excel_file_path} no fue encontrado."
     except Exception as e:
         if conn:
             conn.rollback()
-        return 0, 0, f"Ocurrió un error durante la migración de Excel a BD: {e}"
+        return 0, 0, 0, None, f"Ocurrió un error durante la migración de Excel a BD: {e}"
 
 def buscar_y_procesar_reportes_pendientes(conn):
     """Busca reportes pendientes, los "envía" y actualiza su estado.
@@ -101,6 +117,7 @@ def buscar_y_procesar_reportes_pendientes(conn):
 
     procesados_count = 0
     try:
+        asegurar_tabla_resumen_envios(conn)
         cursor = conn.cursor()
         cursor.execute("SELECT id, cliente, contenido FROM reportes WHERE estado = 'pendiente'")
         reportes_pendientes = cursor.fetchall()
@@ -113,10 +130,12 @@ def buscar_y_procesar_reportes_pendientes(conn):
             reporte_id, cliente, contenido = reporte
             try:
                 cursor.execute("UPDATE reportes SET estado = 'enviado' WHERE id = ?", (reporte_id,))
+                fecha_envio = datetime.now().date() # Usar .date() si solo se quiere la fecha
                 cursor.execute("""
                     INSERT INTO log_envios (reporte_id, cliente, fecha_envio)
                     VALUES (?, ?, ?)
-                """, (reporte_id, cliente, datetime.now().date())) # Usar .date() si solo se quiere la fecha
+                """, (reporte_id, cliente, fecha_envio))
+                acumular_envio_en_resumen(cursor, cliente, fecha_envio)
                 
                 conn.commit()
                 # print(f"  Reporte ID: {reporte_id} marcado como enviado y logueado.") # Silenciado
@@ -197,7 +216,7 @@ class BotGUI:
         frame_select = ttk.LabelFrame(master, text="Selección de Archivo", padding="10")
         frame_select.pack(padx=10, pady=5, fill="x")
 
-        ttk.Button(frame_select, text="Seleccionar Excel", command=self.seleccionar_excel).pack(side=tk.LEFT, padx=5)
+        ttk.Button(frame_select, text="Seleccionar Archivo", command=self.seleccionar_excel).pack(side=tk.LEFT, padx=5)
         self.excel_path_label = ttk.Label(frame_select, textvariable=self.selected_excel_path)
         self.excel_path_label.pack(side=tk.LEFT, padx=5, fill="x", expand=True)
         self.selected_excel_path.set("Ningún archivo seleccionado")
@@ -267,8 +286,15 @@ class BotGUI:
 
     def seleccionar_excel(self):
         filepath = filedialog.askopenfilename(
-            title="Seleccionar archivo Excel",
-            filetypes=(("Archivos Excel", "*.xlsx *.xls"), ("Todos los archivos", "*.*"))
+            title="Seleccionar archivo de reportes",
+            filetypes=(
+                ("Archivos soportados", "*.xlsx *.xls *.csv *.parquet *.pq *.arrow *.feather *.ipc"),
+                ("Archivos Excel", "*.xlsx *.xls"),
+                ("Archivos CSV", "*.csv"),
+                ("Archivos Parquet", "*.parquet *.pq"),
+                ("Archivos Arrow", "*.arrow *.feather *.ipc"),
+                ("Todos los archivos", "*.*")
+            )
         )
         if filepath:
             self.selected_excel_path.set(filepath)
@@ -303,7 +329,7 @@ class BotGUI:
     def cargar_reportes(self):
         excel_path = self.selected_excel_path.get()
         if not excel_path or excel_path == "Ningún archivo seleccionado":
-            messagebox.showwarning("Archivo no seleccionado", "Por favor, seleccione un archivo Excel primero.")
+            messagebox.showwarning("Archivo no seleccionado", "Por favor, seleccione un archivo de reportes primero.")
             return
 
         conn = self._get_db_conn()
@@ -313,19 +339,30 @@ class BotGUI:
         self._log_separator() # <--- AÑADIR ESTA LÍNEA PARA EL SEPARADOR
 
         self._log_message([("Iniciando carga desde:", "bold"), (f"\n{excel_path}", "normal")])
+
+        medidor = MedidorEjecucion('gui', memoria_python=MEDIR_MEMORIA_PYTHON)
+        conn_medida = medidor.medir(conn)
         
-        migrados, existentes, error_migracion = migrar_excel_a_db(conn, excel_path)
+        with medidor.etapa('migrar') as etapa:
+            migrados, existentes, rechazados, ruta_rechazados, error_migracion = migrar_excel_a_db(conn_medida, excel_path)
+            etapa['filas'] = migrados + existentes + rechazados
+
+        if rechazados:
+            detalle = f"detalle en {ruta_rechazados}" if ruta_rechazados else "no se pudo guardar el detalle"
+            self._log_message([("Filas rechazadas por validación:", "bold"), (f"\n{rechazados} ({detalle})", "normal")])
         
+        if migrados or existentes:
+            self._log_message([("Migración completada:", "bold"), (f"\n{migrados} reportes nuevos insertados, {existentes} reportes ya existían.", "normal")])
         if error_migracion:
             self._log_message([("Error en migración: ", "normal"), (str(error_migracion), "normal")])
             messagebox.showerror("Error de Migración", f"Error durante la migración: {error_migracion}")
-        else:
-            self._log_message([("Migración completada:", "bold"), (f"\n{migrados} reportes nuevos insertados, {existentes} reportes ya existían.", "normal")])
 
         # Continuar con el procesamiento de pendientes independientemente del resultado de la migración,
         # a menos que la migración haya sido un fallo catastrófico (ya manejado por el return si conn es None).
         
-        procesados, error_procesamiento = buscar_y_procesar_reportes_pendientes(conn)
+        with medidor.etapa('procesar') as etapa:
+            procesados, error_procesamiento = buscar_y_procesar_reportes_pendientes(conn_medida)
+            etapa['filas'] = procesados
 
         if error_procesamiento and error_procesamiento != "No se encontraron reportes pendientes.":
              self._log_message([("Error en procesamiento: ", "normal"), (str(error_procesamiento), "normal")])
@@ -335,6 +372,8 @@ class BotGUI:
         else:
             self._log_message([("Proceso de envío de reportes completado:", "bold"), (f"\n{procesados} reportes fueron procesados y enviados (simulado).", "normal")])
 
+        self._log_metricas(medidor, conn)
+
         if not error_migracion and (not error_procesamiento or error_procesamiento == "No se encontraron reportes pendientes."):
             messagebox.showinfo("Proceso Completado", "Reportes cargados y procesados correctamente.")
         
@@ -344,6 +383,19 @@ class BotGUI:
 
         # self._close_db_conn() # No cerramos aquí para reutilizar
 
+    def _log_metricas(self, medidor, conn):
+        """Muestra el tiempo de cada etapa y guarda el reporte de la ejecución (JSON + tabla bot_runs)."""
+        reporte = medidor.reporte()
+        detalle = "".join(
+            f"\n{etapa['etapa']}: {etapa['segundos']:.2f} s, {etapa['filas']} filas, "
+            f"{etapa['viajes_bd']} viajes a BD, memoria pico {etapa['memoria_pico_mb']} MB"
+            for etapa in reporte['etapas']
+        )
+        self._log_message([("Métricas de la ejecución:", "bold"), (detalle, "normal")])
+        error = guardar_reporte_ejecucion(conn, reporte, RUN_REPORT_FILE)
+        if error:
+            self._log_message([("Advertencia: ", "normal"), (error, "normal")])
+
     def ver_ultimos_reportes(self):
         conn = self._get_db_conn()
         if not conn:
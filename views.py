@@ -1,31 +1,206 @@
-from flask import Blueprint, render_template, request, redirect, url_for, jsonify # Añadir jsonify
+from flask import (Blueprint, request, redirect, url_for, jsonify, Response,
+                   stream_template, stream_with_context, get_flashed_messages)
 from flask_login import login_required, current_user
-from db_utils import get_all_reports
+import csv
+import io
+import itertools
+import tempfile
+from datetime import date, datetime, timedelta
+from cliente_index import indice_clientes, LIMITE_SUGERENCIAS
+from db_utils import (get_send_stats, iter_reports, iter_send_log,
+                      GRANULARIDADES_STATS, COLUMNAS_REPORTES, COLUMNAS_LOG_ENVIOS, FILAS_POR_LOTE)
 
 views_bp = Blueprint('views', __name__, template_folder='templates')
 
+BYTES_POR_BLOQUE_HTML = 8 * 1024 # Tamaño mínimo de cada escritura del HTML en streaming
+
+def _en_bloques(fragmentos, tamano=BYTES_POR_BLOQUE_HTML):
+    """Junta los fragmentos que va generando la plantilla en bloques de al menos 'tamano'
+    caracteres: Jinja entrega un fragmento por cada trozo de texto o expresión."""
+    bloque, largo = [], 0
+    for fragmento in fragmentos:
+        bloque.append(fragmento)
+        largo += len(fragmento)
+        if largo >= tamano:
+            yield ''.join(bloque)
+            bloque, largo = [], 0
+    if bloque:
+        yield ''.join(bloque)
+
+def _stream_template(template_name, **context):
+    """Renderiza la plantilla con stream_template y la va enviando por bloques mientras se genera.
+
+    Junto con iter_reports, las filas van del cursor al navegador sin armar listas ni el
+    HTML completo en memoria: el navegador empieza a dibujar con el primer bloque.
+    """
+    # Los mensajes flash se consumen antes de empezar a enviar: la cookie de sesión ya
+    # salió con los headers y no podría actualizarse durante el streaming.
+    get_flashed_messages(with_categories=True)
+    return Response(_en_bloques(stream_template(template_name, **context)), mimetype='text/html')
+
+def _iter_reports_o_error(search_term, include_archived):
+    """iter_reports con la primera fila ya leída, antes de empezar a responder.
+
+    Si la BD no responde, el error aparece acá y la plantilla muestra el aviso en lugar
+    de cortarse a mitad de la página con un 200. Retorna (reports, error_bd).
+    """
+    reports = iter_reports(search_term=search_term or None, include_archived=include_archived)
+    try:
+        primero = next(reports, None)
+    except Exception as e:
+        print(f"Error al obtener reportes: {e}")
+        return [], True
+    return ([] if primero is None else itertools.chain([primero], reports)), False
+
 @views_bp.route('/dashboard')
 @login_required
 def dashboard():
     search_term = request.args.get('search', '')
+    include_archived = request.args.get('archivados') == '1'
     # La carga inicial de reportes se hace aquí para el renderizado completo de la página
-    if search_term:
-        reports = get_all_reports(search_term=search_term)
-    else:
-        reports = get_all_reports()
+    reports, error_bd = _iter_reports_o_error(search_term, include_archived)
     
-    return render_template('dashboard.html', reports=reports, search_term=search_term)
+    return _stream_template('dashboard.html', reports=reports, error_bd=error_bd, search_term=search_term,
+                            include_archived=include_archived)
 
 @views_bp.route('/_get_reports_table') # Nueva ruta para AJAX
 @login_required
 def get_reports_table_ajax():
     search_term = request.args.get('search', '') # Mantenemos la capacidad de búsqueda para la actualización
-    if search_term:
-        reports = get_all_reports(search_term=search_term)
-    else:
-        reports = get_all_reports()
+    include_archived = request.args.get('archivados') == '1'
+    reports, error_bd = _iter_reports_o_error(search_term, include_archived)
     
     # Renderizamos solo la plantilla parcial de la tabla
-    return render_template('_report_table.html', reports=reports, search_term=search_term)
+    return _stream_template('_report_table.html', reports=reports, error_bd=error_bd, search_term=search_term,
+                            include_archived=include_archived)
+
+@views_bp.route('/_autocomplete_clientes')
+@login_required
+def autocomplete_clientes():
+    # Sugerencias para el buscador: se responden desde el índice en memoria, sin consultar la BD
+    prefijo = request.args.get('q', '')
+    limite = min(request.args.get('limit', LIMITE_SUGERENCIAS, type=int), 50)
+    return jsonify(indice_clientes.buscar(prefijo, limite=limite))
+
+def _parse_fecha(valor, por_defecto):
+    """Convierte 'YYYY-MM-DD' a date; si falta o es inválido, retorna 'por_defecto'."""
+    try:
+        return datetime.strptime(valor, '%Y-%m-%d').date() if valor else por_defecto
+    except ValueError:
+        return por_defecto
+
+@views_bp.route('/stats')
+@login_required
+def stats():
+    # Estadísticas de envíos desde la tabla de agregados (por defecto, los últimos 30 días por día)
+    hasta = _parse_fecha(request.args.get('hasta'), date.today())
+    desde = _parse_fecha(request.args.get('desde'), hasta - timedelta(days=29))
+    granularidad = request.args.get('granularidad', 'dia')
+    if granularidad not in GRANULARIDADES_STATS:
+        return jsonify({'error': f"granularidad debe ser una de: {', '.join(GRANULARIDADES_STATS)}"}), 400
+    cliente = request.args.get('cliente') or None
+    por_cliente = request.args.get('por_cliente') == '1'
+
+    # Por defecto solo los totales por período (lo que usa el gráfico del dashboard)
+    filas = get_send_stats(desde, hasta, granularidad=granularidad, cliente=cliente, por_cliente=por_cliente)
+
+    return jsonify({
+        'desde': desde.isoformat(),
+        'hasta': hasta.isoformat(),
+        'granularidad': granularidad,
+        'por_cliente' if por_cliente else 'totales': filas,
+    })
+
+FORMATOS_EXPORTACION = {
+    'csv': 'text/csv; charset=utf-8',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+BYTES_POR_BLOQUE_XLSX = 64 * 1024
+MAX_FILAS_XLSX = 1048576 # Límite de filas por hoja de Excel (incluye el encabezado)
+
+def _csv_stream(columnas, filas):
+    """Genera el CSV por bloques de FILAS_POR_LOTE filas (con BOM, igual que el informe del bot)."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    buffer.write('\ufeff')
+    writer.writerow(columnas)
+    for numero, fila in enumerate(filas, start=1):
+        writer.writerow(fila)
+        if numero % FILAS_POR_LOTE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+    yield buffer.getvalue()
+
+def _xlsx_stream(columnas, filas):
+    """Genera el XLSX con openpyxl en modo write_only y lo envía por bloques.
+
+    Un XLSX es un ZIP que recién puede cerrarse al final, así que la descarga arranca
+    cuando el libro está completo; write_only vuelca las filas a disco a medida que se
+    agregan, de modo que la memoria sigue siendo constante.
+    Si hay más filas de las que entran en una hoja de Excel lanza ValueError
+    (antes de enviar nada): esas exportaciones hay que pedirlas en CSV.
+    """
+    from openpyxl import Workbook
+    libro = Workbook(write_only=True)
+    hoja = libro.create_sheet()
+    hoja.append(columnas)
+    for numero, fila in enumerate(filas, start=2):
+        if numero > MAX_FILAS_XLSX:
+            filas.close() # Libera la conexión del generador de db_utils
+            raise ValueError(
+                f"La exportación supera las {MAX_FILAS_XLSX - 1} filas que admite Excel; "
+                "use formato=csv o acote la búsqueda o el rango de fechas"
+            )
+        hoja.append(list(fila))
+    with tempfile.TemporaryFile() as archivo:
+        libro.save(archivo)
+        archivo.seek(0)
+        while True:
+            bloque = archivo.read(BYTES_POR_BLOQUE_XLSX)
+            if not bloque:
+                break
+            yield bloque
+
+@views_bp.route('/export')
+@login_required
+def export():
+    # tipo=reportes exporta el listado filtrado (mismos ?search= y ?archivados=1 que el dashboard);
+    # tipo=envios exporta log_envios entre ?desde= y ?hasta= (por defecto, hoy)
+    tipo = request.args.get('tipo', 'reportes')
+    formato = request.args.get('formato', 'csv')
+    if formato not in FORMATOS_EXPORTACION:
+        return jsonify({'error': "formato debe ser 'csv' o 'xlsx'"}), 400
+
+    if tipo == 'reportes':
+        search_term = request.args.get('search', '')
+        include_archived = request.args.get('archivados') == '1'
+        columnas, filas = COLUMNAS_REPORTES, iter_reports(search_term=search_term or None,
+                                                          include_archived=include_archived)
+        nombre = 'reportes'
+    elif tipo == 'envios':
+        hasta = _parse_fecha(request.args.get('hasta'), date.today())
+        desde = _parse_fecha(request.args.get('desde'), hasta)
+        columnas, filas = COLUMNAS_LOG_ENVIOS, iter_send_log(desde, hasta)
+        nombre = f"envios_{desde.isoformat()}_{hasta.isoformat()}"
+    else:
+        return jsonify({'error': "tipo debe ser 'reportes' o 'envios'"}), 400
+
+    generador = _csv_stream(columnas, filas) if formato == 'csv' else _xlsx_stream(columnas, filas)
+    # Se genera el primer bloque antes de responder: así la falta de conexión, un error de la
+    # consulta o el límite de filas de Excel llegan como error HTTP y no como un 200 con un
+    # archivo vacío. Un error posterior corta la transferencia y la descarga queda incompleta.
+    try:
+        primer_bloque = next(generador)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        print(f"Error al exportar {nombre}: {e}")
+        return jsonify({'error': 'No se pudo generar la exportación'}), 500
+    return Response(
+        stream_with_context(itertools.chain([primer_bloque], generador)),
+        mimetype=FORMATOS_EXPORTACION[formato],
+        headers={'Content-Disposition': f'attachment; filename="{nombre}.{formato}"'},
+    )
 
 # Podrías añadir más vistas aquí si es necesario, por ejemplo, para ver detalles de un reporte
\ No newline at end of file